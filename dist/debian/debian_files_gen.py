@@ -8,39 +8,61 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 #
 
-import string
+import functools
 import os
 import shutil
 import re
 import subprocess
 from pathlib import Path
 
-class DebianFilesTemplate(string.Template):
-    delimiter = '%'
-
-scriptdir = os.path.dirname(__file__)
-
-with open(os.path.join(scriptdir, 'changelog.template')) as f:
-    changelog_template = f.read()
-
-with open(os.path.join(scriptdir, 'control.template')) as f:
-    control_template = f.read()
-
-with open('build/SCYLLA-PRODUCT-FILE') as f:
-    product = f.read().strip()
-
-with open('build/SCYLLA-VERSION-FILE') as f:
-    version = f.read().strip().replace('-', '~')
-
-with open('build/SCYLLA-RELEASE-FILE') as f:
-    release = f.read().strip()
+TEMPLATE_PLACEHOLDER = re.compile(r'%(?:\{(\w+)\}|(\w+))')
+RENAME_PATTERN = re.compile(r'^scylla(?:(?P<unit>-[^.]+)\.(?:service|default)|(?P<helper>-[^.]+\.scylla-[^.]+\.[^.]+))$')
+
+def compile_tmpl(text):
+    '''Split a %-delimited template into its literal parts and the
+    placeholder names between them, so it can be rendered without
+    rescanning the text.'''
+    statics = []
+    names = []
+    pos = 0
+    for m in TEMPLATE_PLACEHOLDER.finditer(text):
+        statics.append(text[pos:m.start()])
+        names.append(m.group(1) or m.group(2))
+        pos = m.end()
+    statics.append(text[pos:])
+    return statics, names
+
+def render(compiled, mapping):
+    statics, names = compiled
+    parts = [statics[0]]
+    for name, static in zip(names, statics[1:]):
+        parts.append(mapping[name])
+        parts.append(static)
+    return ''.join(parts)
+
+@functools.lru_cache(maxsize=None)
+def load_tmpl(path):
+    return compile_tmpl(path.read_text())
+
+scriptdir = Path(__file__).parent
+
+product, version, release = (Path(f'build/SCYLLA-{name}-FILE').read_text().strip()
+                             for name in ('PRODUCT', 'VERSION', 'RELEASE'))
+version = version.replace('-', '~')
 
 if os.path.exists('build/debian/debian'):
     shutil.rmtree('build/debian/debian')
-shutil.copytree('dist/debian/debian', 'build/debian/debian')
+# shutil.copy() is shutil.copyfile(), which uses the kernel's fast copy,
+# plus the permission bits, which debian/rules needs to stay executable.
+shutil.copytree('dist/debian/debian', 'build/debian/debian', copy_function=shutil.copy)
 
 if product != 'scylla':
-    for p in Path('build/debian/debian').glob('scylla-*'):
+    debian_dir = 'build/debian/debian'
+    # Collect the names before renaming anything: the new names may also
+    # start with 'scylla-' and must not be picked up again.
+    with os.scandir(debian_dir) as it:
+        names = [e.name for e in it if e.name.startswith('scylla-')]
+    for name in names:
         # pat1: scylla-server.service
         #    -> scylla-enterprise-server.scylla-server.service
         #       or
@@ -51,25 +73,23 @@ if product != 'scylla':
         # pat3: scylla-conf.install
         #    -> scylla-enterprise-conf.install
 
-        if m := re.match(r'^scylla(-[^.]+)\.(service|default)$', p.name):
-            p.rename(p.parent / f'{product}{m.group(1)}.{p.name}')
-        elif m := re.match(r'^scylla(-[^.]+\.scylla-[^.]+\.[^.]+)$', p.name):
-            p.rename(p.parent / f'{product}{m.group(1)}')
+        if m := RENAME_PATTERN.match(name):
+            if m.group('unit'):
+                newname = f'{product}{m.group("unit")}.{name}'
+            else:
+                newname = f'{product}{m.group("helper")}'
         else:
-            p.rename(p.parent / p.name.replace('scylla', product, 1))
+            newname = name.replace('scylla', product, 1)
+        os.rename(os.path.join(debian_dir, name), os.path.join(debian_dir, newname))
 
-s = DebianFilesTemplate(changelog_template)
-changelog_applied = s.substitute(product=product, version=version, release=release, revision='1', codename='stable')
+changelog_applied = render(load_tmpl(scriptdir / 'changelog.template'),
+                           dict(product=product, version=version, release=release, revision='1', codename='stable'))
 
-s = DebianFilesTemplate(control_template)
-control_applied = s.substitute(product=product)
+control_applied = render(load_tmpl(scriptdir / 'control.template'), dict(product=product))
 
-with open('build/debian/debian/changelog', 'w') as f:
-    f.write(changelog_applied)
+Path('build/debian/debian/changelog').write_text(changelog_applied)
 
-with open('build/debian/debian/control', 'w') as f:
-    f.write(control_applied)
+Path('build/debian/debian/control').write_text(control_applied)
 
-include_binaries = subprocess.run("./scripts/create-relocatable-package.py --print-libexec -", shell=True, check=True, capture_output=True, encoding='utf-8').stdout
-with open('build/debian/debian/source/include-binaries', 'w') as f:
-    f.write(include_binaries)
+include_binaries = subprocess.run(['./scripts/create-relocatable-package.py', '--print-libexec', '-'], check=True, capture_output=True, encoding='utf-8').stdout
+Path('build/debian/debian/source/include-binaries').write_text(include_binaries)
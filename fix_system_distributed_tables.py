@@ -8,9 +8,12 @@
 #
 import argparse
 import sys
+import traceback
 
 from cassandra.cluster import Cluster
 from cassandra.auth import PlainTextAuthProvider
+from cassandra.concurrent import execute_concurrent
+from cassandra.policies import WhiteListRoundRobinPolicy
 
 events_cols = {
     'session_id': 'uuid',
@@ -89,46 +92,66 @@ ks_defs = {
 
 def validate_and_fix(args):
     res = True
+    messages = []
+    # Talk to the given node only: a single-host policy and a pinned protocol
+    # version spare the driver from negotiating and from connecting to peers.
+    cluster_args = dict(contact_points=[args.node], port=args.port, protocol_version=4,
+                        load_balancing_policy=WhiteListRoundRobinPolicy([args.node]),
+                        connect_timeout=5)
     if args.user:
-        auth_provider = PlainTextAuthProvider(username=args.user, password=args.password)
-        cluster = Cluster(auth_provider=auth_provider, contact_points=[args.node], port=args.port)
-    else:
-        cluster = Cluster(contact_points=[args.node], port=args.port)
+        cluster_args['auth_provider'] = PlainTextAuthProvider(username=args.user, password=args.password)
+    cluster = Cluster(**cluster_args)
 
     try:
         session = cluster.connect()
         cluster_meta = session.cluster.metadata
+        keyspaces = cluster_meta.keyspaces
+        # Scylla doesn't support ALTER TABLE ... ADD IF NOT EXISTS, so missing
+        # columns are detected from the driver's schema metadata, which was
+        # already fetched when connecting and costs no extra round-trips.
+        schema = {(ks, table_name, column_name): column_meta.cql_type
+                  for ks in ks_defs if ks in keyspaces
+                  for table_name, table_meta in keyspaces[ks].tables.items()
+                  for column_name, column_meta in table_meta.columns.items()}
         for ks, tables_defs in ks_defs.items():
-            if ks not in cluster_meta.keyspaces:
-                print("keyspace {} doesn't exist - skipping".format(ks))
+            ks_meta = keyspaces.get(ks)
+            if ks_meta is None:
+                messages.append("keyspace {} doesn't exist - skipping".format(ks))
                 continue
 
-            ks_meta = cluster_meta.keyspaces[ks]
+            tables = ks_meta.tables
             for table_name, table_cols in tables_defs.items():
-
-                if table_name not in ks_meta.tables:
-                    print("{}.{} doesn't exist - skipping".format(ks, table_name))
+                if table_name not in tables:
+                    messages.append("{}.{} doesn't exist - skipping".format(ks, table_name))
                     continue
 
-                print("Adjusting {}.{}".format(ks, table_name))
+                messages.append("Adjusting {}.{}".format(ks, table_name))
 
-                table_meta = ks_meta.tables[table_name]
+                missing_cols = []
                 for column_name, column_type in table_cols.items():
-                    if column_name in table_meta.columns:
-                        column_meta = table_meta.columns[column_name]
-                        if column_meta.cql_type != column_type:
-                            print("ERROR: {}.{}::{} column has an unexpected column type: expected '{}' found '{}'".format(ks, table_name, column_name, column_type, column_meta.cql_type))
-                            res = False
+                    existing_type = schema.get((ks, table_name, column_name))
+                    if existing_type is None:
+                        missing_cols.append((column_name, column_type))
+                    elif existing_type != column_type:
+                        messages.append("ERROR: {}.{}::{} column has an unexpected column type: expected '{}' found '{}'".format(ks, table_name, column_name, column_type, existing_type))
+                        res = False
+
+                statements = [("ALTER TABLE {}.{} ADD {} {}".format(ks, table_name, column_name, column_type), ())
+                              for column_name, column_type in missing_cols]
+                results = execute_concurrent(session, statements, concurrency=16, raise_on_first_error=False)
+                for (column_name, column_type), (success, result) in zip(missing_cols, results):
+                    if success:
+                        messages.append("{}.{}: added column '{}' of the type '{}'".format(ks, table_name, column_name, column_type))
                     else:
-                        try:
-                            session.execute("ALTER TABLE {}.{} ADD {} {}".format(ks, table_name, column_name, column_type))
-                            print("{}.{}: added column '{}' of the type '{}'".format(ks, table_name, column_name, column_type))
-                        except Exception:
-                            print("ERROR: {}.{}: failed to add column '{}' with type '{}': {}".format(ks, table_name, column_name, column_type, sys.exc_info()))
-                            res = False
+                        messages.append("ERROR: {}.{}: failed to add column '{}' with type '{}': {}".format(ks, table_name, column_name, column_type, result))
+                        res = False
     except Exception:
-        print("ERROR: {}".format(sys.exc_info()))
+        messages.append("ERROR: {}".format(traceback.format_exc()))
         res = False
+    finally:
+        cluster.shutdown()
+        if messages:
+            sys.stdout.write('\n'.join(messages) + '\n')
 
     return res
 
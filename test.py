@@ -11,9 +11,12 @@ import asyncio
 import collections
 import colorama
 import difflib
-import filecmp
-import glob
+import errno
+import fcntl
+import fnmatch
+import functools
 import itertools
+import json
 import logging
 import multiprocessing
 import os
@@ -38,23 +41,37 @@ from test.pylib.pool import Pool
 from test.pylib.util import LogPrefixAdapter
 from test.pylib.scylla_cluster import ScyllaServer, ScyllaCluster, get_cluster_manager, merge_cmdline_options
 from test.pylib.minio_server import MinioServer
+from xml.sax.saxutils import quoteattr
 from typing import Dict, List, Callable, Any, Iterable, Optional, Awaitable, Union
 
+try:
+    from yaml import CSafeLoader as YamlSafeLoader
+except ImportError:
+    from yaml import SafeLoader as YamlSafeLoader
+
 output_is_a_tty = sys.stdout.isatty()
+reset_all = colorama.Style.RESET_ALL
 
 all_modes = set(['debug', 'release', 'dev', 'sanitize', 'coverage'])
 debug_modes = set(['debug', 'sanitize'])
+# Extract the payload of `ninja mode_list` and `ninja unit_test_list` output
+ninja_mode_list_re = re.compile(r'.* List configured modes\n(.*)\n', re.DOTALL)
+ninja_unit_test_list_re = re.compile(r'.* List configured unit tests\n(.*)\n', re.DOTALL)
+# suite.yaml keys of the per-mode settings
+run_in_keys = {mode: f"run_in_{mode}" for mode in all_modes}
+skip_in_keys = {mode: f"skip_in_{mode}" for mode in all_modes}
 
 
 def create_formatter(*decorators) -> Callable[[Any], str]:
     """Return a function which decorates its argument with the given
     color/style if stdout is a tty, and leaves intact otherwise."""
+    prefix = "".join(decorators)
+    suffix = reset_all
+
     def color(arg: Any) -> str:
-        return "".join(decorators) + str(arg) + colorama.Style.RESET_ALL
+        return f"{prefix}{arg}{suffix}"
 
-    def nocolor(arg: Any) -> str:
-        return str(arg)
-    return color if output_is_a_tty else nocolor
+    return color if output_is_a_tty else str
 
 
 class palette:
@@ -70,9 +87,19 @@ class palette:
     warn = create_formatter(colorama.Fore.YELLOW)
     crit = create_formatter(colorama.Fore.RED, colorama.Style.BRIGHT)
     ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+    ansi_escape_sub = ansi_escape.sub
     @staticmethod
     def nocolor(text: str) -> str:
-        return palette.ansi_escape.sub('', text)
+        # Without a tty the formatters above add no escape sequences
+        if not output_is_a_tty:
+            return text
+        return palette.ansi_escape_sub('', text)
+
+
+# Test result markers, formatted once rather than for every finished test
+status_pass = palette.ok("[ PASS ]")
+status_flaky = palette.warn("[ FLKY ]")
+status_fail = palette.fail("[ FAIL ]")
 
 
 class TestSuite(ABC):
@@ -84,7 +111,9 @@ class TestSuite(ABC):
     artifacts = ArtifactRegistry()
     hosts = HostRegistry()
     FLAKY_RETRIES = 5
+    ADD_TEST_CONCURRENCY = 32
     _next_id = collections.defaultdict(int) # (test_key -> id)
+    _cfg_cache: Dict[str, dict] = dict() # (suite path -> parsed suite.yaml)
 
     def __init__(self, path: str, cfg: dict, options: argparse.Namespace, mode: str) -> None:
         self.suite_path = pathlib.Path(path)
@@ -92,9 +121,12 @@ class TestSuite(ABC):
         self.cfg = cfg
         self.options = options
         self.mode = mode
-        self.suite_key = os.path.join(path, mode)
+        # Part of every test id key, see next_id()
+        self.suite_key = sys.intern(f"{path}/{mode}")
         self.tests: List['Test'] = []
         self.pending_test_count = 0
+        # Test logs go here, create it once rather than per test
+        pathlib.Path(options.tmpdir, mode).mkdir(parents=True, exist_ok=True)
         # The number of failed tests
         self.n_failed = 0
 
@@ -103,7 +135,7 @@ class TestSuite(ABC):
         # Skip tests disabled in suite.yaml
         self.disabled_tests = set(self.cfg.get("disable", []))
         # Skip tests disabled in specific mode.
-        self.disabled_tests.update(self.cfg.get("skip_in_" + mode, []))
+        self.disabled_tests.update(self.cfg.get(skip_in_keys[mode], []))
         self.flaky_tests = set(self.cfg.get("flaky", []))
         # If this mode is one of the debug modes, and there are
         # tests disabled in a debug mode, add these tests to the skip list.
@@ -115,12 +147,9 @@ class TestSuite(ABC):
         # which are listed explicitly in some run_in_<m> where m != mode
         # This of course may create ambiguity with skip_* settings,
         # since the priority of the two is undefined, but oh well.
-        run_in_m = set(self.cfg.get("run_in_" + mode, []))
-        for a in all_modes:
-            if a == mode:
-                continue
-            skip_in_m = set(self.cfg.get("run_in_" + a, []))
-            self.disabled_tests.update(skip_in_m - run_in_m)
+        run_in_m = set(self.cfg.get(run_in_keys[mode], []))
+        run_in_other_modes = set().union(*(self.cfg.get(run_in_keys[a], []) for a in all_modes if a != mode))
+        self.disabled_tests.update(run_in_other_modes - run_in_m)
 
     # Generate a unique ID for `--repeat`ed tests
     # We want these tests to have different XML IDs so test result
@@ -141,11 +170,17 @@ class TestSuite(ABC):
 
     @staticmethod
     def load_cfg(path: str) -> dict:
-        with open(os.path.join(path, "suite.yaml"), "r") as cfg_file:
-            cfg = yaml.safe_load(cfg_file.read())
-            if not isinstance(cfg, dict):
-                raise RuntimeError("Failed to load tests in {}: suite.yaml is empty".format(path))
-            return cfg
+        """Load suite.yaml of the suite at the given path. The file is parsed
+        once and shared by the suite instances of all modes."""
+        key = os.path.abspath(path)
+        cfg = TestSuite._cfg_cache.get(key)
+        if cfg is None:
+            with open(os.path.join(path, "suite.yaml"), "r") as cfg_file:
+                cfg = yaml.load(cfg_file.read(), Loader=YamlSafeLoader)
+                if not isinstance(cfg, dict):
+                    raise RuntimeError("Failed to load tests in {}: suite.yaml is empty".format(path))
+            TestSuite._cfg_cache[key] = cfg
+        return cfg
 
     @staticmethod
     def opt_create(path: str, options: argparse.Namespace, mode: str) -> 'TestSuite':
@@ -185,7 +220,8 @@ class TestSuite(ABC):
         pass
 
     @abstractmethod
-    async def add_test(self, shortname: str) -> None:
+    async def add_test(self, shortname: str, count: int = 1) -> None:
+        """Add count instances of the test to the suite"""
         pass
 
     async def run(self, test: 'Test', options: argparse.Namespace):
@@ -210,8 +246,14 @@ class TestSuite(ABC):
         return self.tests
 
     def build_test_list(self) -> List[str]:
-        return [os.path.splitext(t.relative_to(self.suite_path))[0] for t in
-                self.suite_path.glob(self.pattern)]
+        with os.scandir(self.suite_path) as it:
+            names = [entry.name for entry in it]
+        return [os.path.splitext(name)[0] for name in fnmatch.filter(names, self.pattern)]
+
+    async def prepare_test_list(self, shortnames: List[str]) -> None:
+        """Called with the names of the tests selected to run, before
+        they are added to the suite"""
+        pass
 
     async def add_test_list(self) -> None:
         options = self.options
@@ -221,35 +263,58 @@ class TestSuite(ABC):
             # so pop them up while sorting the list
             lst.sort(key=lambda x: (x not in self.run_first_tests, x))
 
-        pending = set()
+        # A test is selected if any of the names is a substring of its path
+        name_re = re.compile("|".join(re.escape(p) for p in options.name)) if options.name else None
+        selected = []
         for shortname in lst:
             if shortname in self.disabled_tests:
                 continue
 
             t = os.path.join(self.name, shortname)
-            patterns = options.name if options.name else [t]
             if options.skip_pattern and options.skip_pattern in t:
                 continue
 
-            async def add_test(shortname) -> None:
-                # Add variants of the same test sequentially
-                # so that case cache has a chance to populate
-                for i in range(options.repeat):
-                    await self.add_test(shortname)
-                    self.pending_test_count += 1
-
-            for p in patterns:
-                if p in t:
-                    pending.add(asyncio.create_task(add_test(shortname)))
-        if len(pending) == 0:
+            if name_re is None or name_re.search(t):
+                selected.append(shortname)
+        if len(selected) == 0:
+            return
+
+        await self.prepare_test_list(selected)
+
+        # Limit the number of tests being added at the same time
+        sem = asyncio.Semaphore(self.ADD_TEST_CONCURRENCY)
+
+        async def add_test(shortname) -> None:
+            async with sem:
+                await self.add_test(shortname, options.repeat)
+                self.pending_test_count += options.repeat
+
+        if sys.version_info >= (3, 11):
+            # The task group cancels the remaining tasks if one fails
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    for shortname in selected:
+                        tg.create_task(add_test(shortname))
+            except BaseExceptionGroup as e:
+                # Raise the failure itself, like the fallback below does,
+                # so callers don't have to deal with exception groups
+                raise e.exceptions[0] from None
             return
+
+        pending = set(asyncio.create_task(add_test(shortname)) for shortname in selected)
         try:
-            await asyncio.gather(*pending)
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_EXCEPTION)
         except asyncio.CancelledError:
             for task in pending:
                 task.cancel()
             await asyncio.gather(*pending, return_exceptions=True)
             raise
+        # On failure, cancel the rest right away rather than letting it run
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for task in done:
+            task.result()
 
 
 class UnitTestSuite(TestSuite):
@@ -266,7 +331,7 @@ class UnitTestSuite(TestSuite):
         test = UnitTest(self.next_id((shortname, self.suite_key)), shortname, suite, args)
         self.tests.append(test)
 
-    async def add_test(self, shortname) -> None:
+    async def add_test(self, shortname, count: int = 1) -> None:
         """Create a UnitTest class with possibly custom command line
         arguments and add it to the list of tests"""
         # Skip tests which are not configured, and hence are not built
@@ -276,8 +341,9 @@ class UnitTestSuite(TestSuite):
         # Default seastar arguments, if not provided in custom test options,
         # are two cores and 2G of RAM
         args = self.custom_args.get(shortname, ["-c2 -m2G"])
-        for a in args:
-            await self.create_test(shortname, self, a)
+        for i in range(count):
+            for a in args:
+                await self.create_test(shortname, self, a)
 
     @property
     def pattern(self) -> str:
@@ -290,31 +356,113 @@ class BoostTestSuite(UnitTestSuite):
     # A cache of individual test cases, for which we have called
     # --list_content. Static to share across all modes.
     _case_cache: Dict[str, List[str]] = dict()
+    # Test cases are the lines of --list_content output ending with '*'
+    case_re = re.compile(rb'^(.*?)\*\r?$', re.MULTILINE)
+    # An on-disk copy of the case cache, per mode, keyed by the test binary
+    # path and stamped with its mtime and size. Lets the next test.py run
+    # skip --list_content for binaries which were not rebuilt.
+    _case_cache_files: Dict[str, Dict[str, Any]] = dict()
+    _dirty_case_cache_files: set = set()
 
     def __init__(self, path, cfg: dict, options: argparse.Namespace, mode) -> None:
         super().__init__(path, cfg, options, mode)
 
-    async def create_test(self, shortname: str, suite, args) -> None:
-        options = self.options
-        allows_compaction_groups = self.all_can_run_compaction_groups_except != None and shortname not in self.all_can_run_compaction_groups_except
-        if options.parallel_cases and (shortname not in self.no_parallel_cases):
-            fqname = os.path.join(self.mode, self.name, shortname)
-            if fqname not in self._case_cache:
-                exe = os.path.join("build", suite.mode, "test", suite.name, shortname)
+    async def list_cases(self, shortname: str) -> List[str]:
+        """Return the test cases of the given test binary, running it
+        with --list_content unless they are already in the case cache"""
+        fqname = os.path.join(self.mode, self.name, shortname)
+        if fqname not in self._case_cache:
+            exe = os.path.join("build", self.mode, "test", self.name, shortname)
+            st = os.stat(exe)
+            stamp = [st.st_mtime_ns, st.st_size]
+            case_cache_file = self.load_case_cache_file()
+            entry = case_cache_file.get(exe)
+            if entry is not None and entry["stamp"] == stamp and entry["cases"]:
+                case_list = entry["cases"]
+            else:
                 process = await asyncio.create_subprocess_exec(
                     exe, *['--list_content'],
                     stderr=asyncio.subprocess.PIPE,
                     stdout=asyncio.subprocess.PIPE,
-                    env=dict(os.environ,
-                             **{"ASAN_OPTIONS": "halt_on_error=0"}),
-                    preexec_fn=os.setsid,
+                    env={**os.environ, "ASAN_OPTIONS": "halt_on_error=0"},
+                    start_new_session=True,
                 )
-                _, stderr = await asyncio.wait_for(process.communicate(), options.timeout)
+                _, stderr = await asyncio.wait_for(process.communicate(), self.options.timeout)
+
+                case_list = [m.group(1).decode() for m in BoostTestSuite.case_re.finditer(stderr)]
+                # Only persist a successful listing: a failed or empty one
+                # must not outlive this run, or the binary's cases would be
+                # skipped by every run until it is rebuilt.
+                if process.returncode == 0 and case_list:
+                    case_cache_file[exe] = {"stamp": stamp, "cases": case_list}
+                    self._dirty_case_cache_files.add(self.mode)
+            self._case_cache[fqname] = case_list
+        return self._case_cache[fqname]
+
+    def case_cache_filename(self) -> str:
+        return os.path.join("build", self.mode, ".boost_case_cache.json")
+
+    def load_case_cache_file(self) -> Dict[str, Any]:
+        """Return the on-disk case cache of this suite's mode, reading it on first use"""
+        case_cache_file = self._case_cache_files.get(self.mode)
+        if case_cache_file is None:
+            try:
+                with open(self.case_cache_filename(), "r") as f:
+                    case_cache_file = json.load(f)
+            except (OSError, ValueError):
+                case_cache_file = dict()
+            self._case_cache_files[self.mode] = case_cache_file
+        return case_cache_file
+
+    def save_case_cache_file(self) -> None:
+        """Merge the case cache entries of this mode into the on-disk case
+        cache. The file is locked, so that concurrent test.py runs don't
+        lose each other's updates, and replaced atomically."""
+        if self.mode not in self._dirty_case_cache_files:
+            return
+        filename = self.case_cache_filename()
+        try:
+            with open(filename + ".lock", "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    with open(filename, "r") as f:
+                        merged = json.load(f)
+                except (OSError, ValueError):
+                    merged = dict()
+                merged.update(self._case_cache_files[self.mode])
+                tmp_filename = "{}.{}".format(filename, os.getpid())
+                with open(tmp_filename, "w") as f:
+                    json.dump(merged, f)
+                os.replace(tmp_filename, filename)
+        except OSError as e:
+            logging.warning("Failed to save boost case cache %s: %s", filename, e)
+            return
+        self._dirty_case_cache_files.discard(self.mode)
+
+    async def prepare_test_list(self, shortnames: List[str]) -> None:
+        """List the cases of all selected test binaries concurrently,
+        rather than one by one as the tests are created"""
+        options = self.options
+        if not options.parallel_cases:
+            return
+        to_list = set(shortname for shortname in shortnames
+                      if shortname not in self.no_parallel_cases and
+                      os.path.join("test", self.name, shortname) in options.tests)
+        # Don't spawn more --list_content processes at once than there are CPUs
+        sem = asyncio.Semaphore(multiprocessing.cpu_count())
+
+        async def list_cases(shortname: str) -> None:
+            async with sem:
+                await self.list_cases(shortname)
 
-                case_list = [case[:-1] for case in stderr.decode().splitlines() if case.endswith('*')]
-                self._case_cache[fqname] = case_list
+        await asyncio.gather(*[list_cases(shortname) for shortname in to_list])
+        self.save_case_cache_file()
 
-            case_list = self._case_cache[fqname]
+    async def create_test(self, shortname: str, suite, args) -> None:
+        options = self.options
+        allows_compaction_groups = self.all_can_run_compaction_groups_except != None and shortname not in self.all_can_run_compaction_groups_except
+        if options.parallel_cases and (shortname not in self.no_parallel_cases):
+            case_list = await self.list_cases(shortname)
             if len(case_list) == 1:
                 test = BoostTest(self.next_id((shortname, self.suite_key)), shortname, suite, args, None, allows_compaction_groups)
                 self.tests.append(test)
@@ -338,7 +486,7 @@ class PythonTestSuite(TestSuite):
         super().__init__(path, cfg, options, mode)
         self.scylla_exe = os.path.join("build", self.mode, "scylla")
         if self.mode == "coverage":
-            self.scylla_env = coverage.env(self.scylla_exe, distinct_id=self.name)
+            self.scylla_env = dict(coverage_env(self.scylla_exe, self.name))
         else:
             self.scylla_env = dict()
         self.scylla_env['SCYLLA'] = self.scylla_exe
@@ -359,25 +507,28 @@ class PythonTestSuite(TestSuite):
         self.clusters = Pool(pool_size, self.create_cluster, recycle_cluster)
 
     def get_cluster_factory(self, cluster_size: int, options: argparse.Namespace) -> Callable[..., Awaitable]:
+        suite_cmdline_options = self.cfg.get("extra_scylla_cmdline_options", [])
+        if type(suite_cmdline_options) == str:
+            suite_cmdline_options = [suite_cmdline_options]
+
+        # There are multiple sources of config options, with increasing priority
+        # (if two sources provide the same config option, the higher priority one wins):
+        # 1. the defaults
+        # 2. suite-specific config options (in "extra_scylla_config_options")
+        # 3. config options from tests (when servers are added during a test)
+        # The first two are the same for all servers of the suite.
+        default_config_options = \
+                {"authenticator": "PasswordAuthenticator",
+                 "authorizer": "CassandraAuthorizer"}
+        suite_config_options = default_config_options | \
+                               self.cfg.get("extra_scylla_config_options", {})
+
         def create_server(create_cfg: ScyllaCluster.CreateServerParams):
-            cmdline_options = self.cfg.get("extra_scylla_cmdline_options", [])
-            if type(cmdline_options) == str:
-                cmdline_options = [cmdline_options]
-            cmdline_options = merge_cmdline_options(cmdline_options, create_cfg.cmdline_from_test)
+            cmdline_options = merge_cmdline_options(suite_cmdline_options, create_cfg.cmdline_from_test)
             if options.x_log2_compaction_groups:
                 cmdline_options = merge_cmdline_options(cmdline_options, [ '--x-log2-compaction-groups={}'.format(options.x_log2_compaction_groups) ])
 
-            # There are multiple sources of config options, with increasing priority
-            # (if two sources provide the same config option, the higher priority one wins):
-            # 1. the defaults
-            # 2. suite-specific config options (in "extra_scylla_config_options")
-            # 3. config options from tests (when servers are added during a test)
-            default_config_options = \
-                    {"authenticator": "PasswordAuthenticator",
-                     "authorizer": "CassandraAuthorizer"}
-            config_options = default_config_options | \
-                             self.cfg.get("extra_scylla_config_options", {}) | \
-                             create_cfg.config_from_test
+            config_options = suite_config_options | create_cfg.config_from_test
 
             server = ScyllaServer(
                 exe=self.scylla_exe,
@@ -415,17 +566,24 @@ class PythonTestSuite(TestSuite):
 
     def build_test_list(self) -> List[str]:
         """For pytest, search for directories recursively"""
-        path = self.suite_path
-        pytests = itertools.chain(path.rglob("*_test.py"), path.rglob("test_*.py"))
-        return [os.path.splitext(t.relative_to(self.suite_path))[0] for t in pytests]
+        root = str(self.suite_path)
+        tests = []
+        for dirpath, _, filenames in os.walk(root):
+            reldir = os.path.relpath(dirpath, root)
+            for name in filenames:
+                if name.endswith("_test.py") or (name.startswith("test_") and name.endswith(".py")):
+                    name = name[:-len(".py")]
+                    tests.append(name if reldir == os.curdir else os.path.join(reldir, name))
+        return tests
 
     @property
     def pattern(self) -> str:
         assert False
 
-    async def add_test(self, shortname) -> None:
-        test = PythonTest(self.next_id((shortname, self.suite_key)), shortname, self)
-        self.tests.append(test)
+    async def add_test(self, shortname, count: int = 1) -> None:
+        for i in range(count):
+            test = PythonTest(self.next_id((shortname, self.suite_key)), shortname, self)
+            self.tests.append(test)
 
 
 class CQLApprovalTestSuite(PythonTestSuite):
@@ -437,9 +595,10 @@ class CQLApprovalTestSuite(PythonTestSuite):
     def build_test_list(self) -> List[str]:
         return TestSuite.build_test_list(self)
 
-    async def add_test(self, shortname: str) -> None:
-        test = CQLApprovalTest(self.next_id((shortname, self.suite_key)), shortname, self)
-        self.tests.append(test)
+    async def add_test(self, shortname: str, count: int = 1) -> None:
+        for i in range(count):
+            test = CQLApprovalTest(self.next_id((shortname, self.suite_key)), shortname, self)
+            self.tests.append(test)
 
     @property
     def pattern(self) -> str:
@@ -457,10 +616,11 @@ class TopologyTestSuite(PythonTestSuite):
         """Build list of Topology python tests"""
         return TestSuite.build_test_list(self)
 
-    async def add_test(self, shortname: str) -> None:
+    async def add_test(self, shortname: str, count: int = 1) -> None:
         """Add test to suite"""
-        test = TopologyTest(self.next_id((shortname, 'topology', self.mode)), shortname, self)
-        self.tests.append(test)
+        for i in range(count):
+            test = TopologyTest(self.next_id((shortname, 'topology', self.mode)), shortname, self)
+            self.tests.append(test)
 
     @property
     def pattern(self) -> str:
@@ -475,14 +635,15 @@ class RunTestSuite(TestSuite):
         super().__init__(path, cfg, options, mode)
         self.scylla_exe = os.path.join("build", self.mode, "scylla")
         if self.mode == "coverage":
-            self.scylla_env = coverage.env(self.scylla_exe, distinct_id=self.name)
+            self.scylla_env = dict(coverage_env(self.scylla_exe, self.name))
         else:
             self.scylla_env = dict()
         self.scylla_env['SCYLLA'] = self.scylla_exe
 
-    async def add_test(self, shortname) -> None:
-        test = RunTest(self.next_id((shortname, self.suite_key)), shortname, self)
-        self.tests.append(test)
+    async def add_test(self, shortname, count: int = 1) -> None:
+        for i in range(count):
+            test = RunTest(self.next_id((shortname, self.suite_key)), shortname, self)
+            self.tests.append(test)
 
     @property
     def pattern(self) -> str:
@@ -504,8 +665,8 @@ class Test:
         self.suite = suite
         # Unique file name, which is also readable by human, as filename prefix
         self.uname = "{}.{}.{}".format(self.suite.name, self.shortname, self.id)
+        # The directory is created by the suite
         self.log_filename = pathlib.Path(suite.options.tmpdir) / self.mode / (self.uname + ".log")
-        self.log_filename.parent.mkdir(parents=True, exist_ok=True)
         self.is_flaky = self.shortname in suite.flaky_tests
         # True if the test was retried after it failed
         self.is_flaky_failure = False
@@ -514,12 +675,16 @@ class Test:
         self.is_cancelled = False
         Test._reset(self)
 
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        # The _reset() methods defined along the class hierarchy, base first
+        cls._reset_chain = tuple(c.__dict__['_reset'] for c in reversed(cls.__mro__)
+                                 if '_reset' in c.__dict__)
+
     def reset(self) -> None:
         """Reset this object, including all derived state."""
-        for cls in reversed(self.__class__.__mro__):
-            _reset = getattr(cls, '_reset', None)
-            if _reset is not None:
-                _reset(self)
+        for _reset in type(self)._reset_chain:
+            _reset(self)
 
     def _reset(self) -> None:
         """Reset the test before a retry, if it is retried as flaky"""
@@ -527,6 +692,9 @@ class Test:
         self.time_start: float = 0
         self.time_end: float = 0
 
+    # __init_subclass__() only sets this for the derived classes
+    _reset_chain = (_reset,)
+
     @abstractmethod
     async def run(self, options: argparse.Namespace) -> 'Test':
         pass
@@ -556,18 +724,31 @@ class Test:
             system_out.text = read_log(self.log_filename)
 
 
+@functools.lru_cache(maxsize=None)
+def coverage_env(path: str, distinct_id: Optional[str] = None) -> Dict[str, str]:
+    """coverage.env(), computed once per executable. The result is
+    shared, so copy it before modifying it."""
+    return coverage.env(path, distinct_id=distinct_id)
+
+
+@functools.lru_cache(maxsize=None)
+def shlex_split_cached(s: str) -> tuple:
+    """shlex.split() the same test arguments only once"""
+    return tuple(shlex.split(s))
+
+
 class UnitTest(Test):
-    standard_args = shlex.split("--overprovisioned --unsafe-bypass-fsync 1 "
-                                "--kernel-page-cache 1 "
-                                "--blocked-reactor-notify-ms 2000000 --collectd 0 "
-                                "--max-networking-io-control-blocks=100 ")
+    standard_args = shlex_split_cached("--overprovisioned --unsafe-bypass-fsync 1 "
+                                       "--kernel-page-cache 1 "
+                                       "--blocked-reactor-notify-ms 2000000 --collectd 0 "
+                                       "--max-networking-io-control-blocks=100 ")
 
     def __init__(self, test_no: int, shortname: str, suite, args: str) -> None:
         super().__init__(test_no, shortname, suite)
         self.path = os.path.join("build", self.mode, "test", self.name)
-        self.args = shlex.split(args) + UnitTest.standard_args
+        self.args = [*shlex_split_cached(args), *UnitTest.standard_args]
         if self.mode == "coverage":
-            self.env = coverage.env(self.path)
+            self.env = coverage_env(self.path)
         else:
             self.env = dict()
         UnitTest._reset(self)
@@ -578,7 +759,7 @@ class UnitTest(Test):
 
     def print_summary(self) -> None:
         print("Output of {} {}:".format(self.path, " ".join(self.args)))
-        print(read_log(self.log_filename))
+        print(read_log(self.log_filename, CONSOLE_LOG_MAX_BYTES))
 
     async def run(self, options) -> Test:
         self.success = await run_test(self, options, env=self.env)
@@ -588,6 +769,10 @@ class UnitTest(Test):
 
 class BoostTest(UnitTest):
     """A unit test which can produce its own XML output"""
+    fixed_args = ('--report_level=no',
+                  '--catch_system_errors=no',  # causes undebuggable cores
+                  '--color_output=false',
+                  '--')
 
     def __init__(self, test_no: int, shortname: str, suite, args: str,
                  casename: Optional[str], allows_compaction_groups : bool) -> None:
@@ -597,11 +782,8 @@ class BoostTest(UnitTest):
             boost_args += ['--run_test=' + casename]
         super().__init__(test_no, shortname, suite, args)
         self.xmlout = os.path.join(suite.options.tmpdir, self.mode, "xml", self.uname + ".xunit.xml")
-        boost_args += ['--report_level=no',
-                       '--logger=HRF,test_suite:XML,test_suite,' + self.xmlout]
-        boost_args += ['--catch_system_errors=no']  # causes undebuggable cores
-        boost_args += ['--color_output=false']
-        boost_args += ['--']
+        boost_args += ['--logger=HRF,test_suite:XML,test_suite,' + self.xmlout]
+        boost_args += BoostTest.fixed_args
         self.args = boost_args + self.args
         self.casename = casename
         BoostTest._reset(self)
@@ -619,10 +801,11 @@ class BoostTest(UnitTest):
             # doesn't add any infomation. Add the mode, otherwise failures
             # in different modes are indistinguishable. The "test/" prefix adds
             # no information, so remove it.
-            import re
-            name = re.sub(r'^test/', '', name)
-            name = re.sub(r'\.cc$', '', name)
-            name = re.sub(r'/', '.', name)
+            if name.startswith('test/'):
+                name = name[len('test/'):]
+            if name.endswith('.cc'):
+                name = name[:-len('.cc')]
+            name = name.replace('/', '.')
             # add the suite name to disambiguate tests named "run"
             name = f'{self.suite.name}.{name}.{self.mode}'
             return name
@@ -632,7 +815,7 @@ class BoostTest(UnitTest):
             suites = root.findall('.//TestSuite')
             for suite in suites:
                 suite.attrib['name'] = adjust_suite_name(suite.attrib['name'])
-                skipped = suite.findall('./TestCase[@reason="disabled"]')
+                skipped = [e for e in suite if e.tag == 'TestCase' and e.get('reason') == 'disabled']
                 for e in skipped:
                     suite.remove(e)
             os.unlink(self.xmlout)
@@ -664,6 +847,7 @@ class CQLApprovalTest(Test):
         self.cql = suite.suite_path / (self.shortname + ".cql")
         self.result = suite.suite_path / (self.shortname + ".result")
         self.tmpfile = os.path.join(suite.options.tmpdir, self.mode, self.uname + ".reject")
+        self.tmpfile_path = pathlib.Path(self.tmpfile)
         self.reject = suite.suite_path / (self.shortname + ".reject")
         self.server_log: Optional[str] = None
         self.server_log_filename: Optional[pathlib.Path] = None
@@ -681,9 +865,7 @@ class CQLApprovalTest(Test):
         self.server_log = None
         self.server_log_filename = None
         self.env: Dict[str, str] = dict()
-        old_tmpfile = pathlib.Path(self.tmpfile)
-        if old_tmpfile.exists():
-            old_tmpfile.unlink()
+        self.tmpfile_path.unlink(missing_ok=True)
         self.args = [
             "-s",  # don't capture print() inside pytest
             "test/pylib/cql_repl/cql_repl.py",
@@ -728,9 +910,10 @@ Check test log at {}.""".format(self.log_filename))
                     set_summary("failed: no result file")
                     self.is_new = True
                 else:
-                    self.is_equal_result = filecmp.cmp(self.result, self.tmpfile)
+                    self.is_equal_result = files_equal(self.result, self.tmpfile)
                     if self.is_equal_result is False:
-                        self.unidiff = format_unidiff(str(self.result), self.tmpfile)
+                        # difflib is slow on large outputs, don't block the event loop
+                        self.unidiff = await asyncio.to_thread(format_unidiff, str(self.result), self.tmpfile)
                         set_summary("failed: test output does not match expected result")
                         assert self.unidiff is not None
                         logger.info("\n{}".format(palette.nocolor(self.unidiff)))
@@ -743,7 +926,7 @@ Check test log at {}.""".format(self.log_filename))
                 # 1) failed pre-check, e.g. start failure
                 # 2) failed test execution.
                 if self.is_executed_ok is False:
-                    self.server_log = cluster.read_server_log()
+                    self.server_log = await asyncio.to_thread(cluster.read_server_log)
                     self.server_log_filename = cluster.server_log_filename()
                     if self.is_before_test_ok is False:
                         set_summary("pre-check failed: {}".format(e))
@@ -753,14 +936,20 @@ Check test log at {}.""".format(self.log_filename))
                         raise
                 set_summary("failed: {}".format(e))
             finally:
-                if os.path.exists(self.tmpfile):
+                if self.tmpfile_path.exists():
                     if self.is_executed_ok and (self.is_new or self.is_equal_result is False):
                         # Move the .reject file close to the .result file
                         # so that it's easy to analyze the diff or overwrite .result
                         # with .reject.
-                        shutil.move(self.tmpfile, self.reject)
+                        try:
+                            os.replace(self.tmpfile, self.reject)
+                        except OSError as e:
+                            # --tmpdir may be on another file system than the test suite
+                            if e.errno != errno.EXDEV:
+                                raise
+                            shutil.move(self.tmpfile, self.reject)
                     else:
-                        pathlib.Path(self.tmpfile).unlink()
+                        self.tmpfile_path.unlink()
 
         return self
 
@@ -768,7 +957,7 @@ Check test log at {}.""".format(self.log_filename))
         print("Test {} ({}) {}".format(palette.path(self.name), self.mode,
                                        self.summary))
         if self.is_executed_ok is False:
-            print(read_log(self.log_filename))
+            print(read_log(self.log_filename, CONSOLE_LOG_MAX_BYTES))
             if self.server_log is not None:
                 print("Server log of the first server:")
                 print(self.server_log)
@@ -807,7 +996,7 @@ class RunTest(Test):
 
     def print_summary(self) -> None:
         print("Output of {} {}:".format(self.path, " ".join(self.args)))
-        print(read_log(self.log_filename))
+        print(read_log(self.log_filename, CONSOLE_LOG_MAX_BYTES))
 
     async def run(self, options: argparse.Namespace) -> Test:
         # This test can and should be killed gently, with SIGTERM, not with SIGKILL
@@ -851,7 +1040,7 @@ class PythonTest(Test):
 
     def print_summary(self) -> None:
         print("Output of {} {}:".format(self.path, " ".join(self.args)))
-        print(read_log(self.log_filename))
+        print(read_log(self.log_filename, CONSOLE_LOG_MAX_BYTES))
         if self.server_log is not None:
             print("Server log of the first server:")
             print(self.server_log)
@@ -874,7 +1063,7 @@ class PythonTest(Test):
             self.is_after_test_ok = True
             self.success = status
         except Exception as e:
-            self.server_log = cluster.read_server_log()
+            self.server_log = await asyncio.to_thread(cluster.read_server_log)
             self.server_log_filename = cluster.server_log_filename()
             if self.is_before_test_ok is False:
                 print("Test {} pre-check failed: {}".format(self.name, str(e)))
@@ -915,7 +1104,7 @@ class TopologyTest(PythonTest):
                 await manager.start()
                 self.success = await run_test(self, options)
             except Exception as e:
-                self.server_log = manager.cluster.read_server_log()
+                self.server_log = await asyncio.to_thread(manager.cluster.read_server_log)
                 self.server_log_filename = manager.cluster.server_log_filename()
                 if manager.is_before_test_ok is False:
                     print("Test {} pre-check failed: {}".format(self.name, str(e)))
@@ -934,7 +1123,6 @@ class TabularConsoleOutput:
         self.test_count = test_count
         self.print_newline = False
         self.last_test_no = 0
-        self.last_line_len = 1
 
     def print_start_blurb(self) -> None:
         print("="*80)
@@ -948,16 +1136,12 @@ class TabularConsoleOutput:
 
     def print_progress(self, test: Test) -> None:
         self.last_test_no += 1
-        status = ""
         if test.success:
             logging.debug("Test {} is flaky {}".format(test.uname,
                                                        test.is_flaky_failure))
-            if test.is_flaky_failure:
-                status = palette.warn("[ FLKY ]")
-            else:
-                status = palette.ok("[ PASS ]")
+            status = status_flaky if test.is_flaky_failure else status_pass
         else:
-            status = palette.fail("[ FAIL ]")
+            status = status_fail
         msg = "{:10s} {:^8s} {:^7s} {:8s} {}".format(
             "[{}/{}]".format(self.last_test_no, self.test_count),
             test.suite.name, test.mode[:7],
@@ -966,9 +1150,9 @@ class TabularConsoleOutput:
         )
         if self.verbose is False:
             if test.success:
-                print("\r" + " " * self.last_line_len, end="")
-                self.last_line_len = len(msg)
-                print("\r" + msg, end="")
+                # Erase the previous progress line in place: ESC[2K clears
+                # the whole line, whatever its length
+                print("\x1b[2K\r" + msg, end="")
                 self.print_newline = True
             else:
                 if self.print_newline:
@@ -980,61 +1164,64 @@ class TabularConsoleOutput:
             print(msg)
 
 
+UBSAN_OPTIONS = ":".join(filter(None, [
+    "halt_on_error=1",
+    "abort_on_error=1",
+    f"suppressions={os.getcwd()}/ubsan-suppressions.supp",
+    os.getenv("UBSAN_OPTIONS"),
+]))
+ASAN_OPTIONS = ":".join(filter(None, [
+    "disable_coredump=0",
+    "abort_on_error=1",
+    "detect_stack_use_after_return=1",
+    os.getenv("ASAN_OPTIONS"),
+]))
+
+
 async def run_test(test: Test, options: argparse.Namespace, gentle_kill=False, env=dict()) -> bool:
     """Run test program, return True if success else False"""
 
     with test.log_filename.open("wb") as log:
 
         def report_error(error):
-            msg = "=== TEST.PY SUMMARY START ===\n"
-            msg += "{}\n".format(error)
-            msg += "=== TEST.PY SUMMARY END ===\n"
+            msg = f"=== TEST.PY SUMMARY START ===\n{error}\n=== TEST.PY SUMMARY END ===\n"
             log.write(msg.encode(encoding="UTF-8"))
         process = None
         stdout = None
         logging.info("Starting test %s: %s %s", test.uname, test.path, " ".join(test.args))
-        UBSAN_OPTIONS = [
-            "halt_on_error=1",
-            "abort_on_error=1",
-            f"suppressions={os.getcwd()}/ubsan-suppressions.supp",
-            os.getenv("UBSAN_OPTIONS"),
-        ]
-        ASAN_OPTIONS = [
-            "disable_coredump=0",
-            "abort_on_error=1",
-            "detect_stack_use_after_return=1",
-            os.getenv("ASAN_OPTIONS"),
-        ]
         try:
-            log.write("=== TEST.PY STARTING TEST {} ===\n".format(test.uname).encode(encoding="UTF-8"))
-            log.write("export UBSAN_OPTIONS='{}'\n".format(
-                ":".join(filter(None, UBSAN_OPTIONS))).encode(encoding="UTF-8"))
-            log.write("export ASAN_OPTIONS='{}'\n".format(
-                ":".join(filter(None, ASAN_OPTIONS))).encode(encoding="UTF-8"))
-            log.write("{} {}\n".format(test.path, " ".join(test.args)).encode(encoding="UTF-8"))
-            log.write("=== TEST.PY TEST {} OUTPUT ===\n".format(test.uname).encode(encoding="UTF-8"))
+            args_str = " ".join(test.args)
+            header = (f"=== TEST.PY STARTING TEST {test.uname} ===\n"
+                      f"export UBSAN_OPTIONS='{UBSAN_OPTIONS}'\n"
+                      f"export ASAN_OPTIONS='{ASAN_OPTIONS}'\n"
+                      f"{test.path} {args_str}\n"
+                      f"=== TEST.PY TEST {test.uname} OUTPUT ===\n")
+            log.write(header.encode(encoding="UTF-8"))
             log.flush()
             test.time_start = time.time()
             test.time_end = 0
 
+            # Built from the live environment for each test, as some of it
+            # (e.g. the S3 server address) is only set once test.py runs.
+            process_env = dict(os.environ, UBSAN_OPTIONS=UBSAN_OPTIONS, ASAN_OPTIONS=ASAN_OPTIONS)
+            # TMPDIR env variable is used by any seastar/scylla
+            # test for directory to store test temporary data.
+            process_env["TMPDIR"] = os.path.join(options.tmpdir, test.mode)
+            process_env.update(env)
             path = test.path
             args = test.args
             if options.cpus:
                 path = 'taskset'
                 args = ['-c', options.cpus, test.path, *test.args]
+            # The test writes straight into the log file: the output never
+            # passes through test.py, which only reads the log back if the
+            # test fails.
             process = await asyncio.create_subprocess_exec(
                 path, *args,
                 stderr=log,
                 stdout=log,
-                env=dict(os.environ,
-                         UBSAN_OPTIONS=":".join(filter(None, UBSAN_OPTIONS)),
-                         ASAN_OPTIONS=":".join(filter(None, ASAN_OPTIONS)),
-                         # TMPDIR env variable is used by any seastar/scylla
-                         # test for directory to store test temporary data.
-                         TMPDIR=os.path.join(options.tmpdir, test.mode),
-                         **env,
-                         ),
-                preexec_fn=os.setsid,
+                env=process_env,
+                start_new_session=True,
             )
             stdout, _ = await asyncio.wait_for(process.communicate(), options.timeout)
             test.time_end = time.time()
@@ -1150,6 +1337,18 @@ def parse_cmd_line() -> argparse.Namespace:
 
     args = parser.parse_args()
 
+    def start_ninja(target: str) -> subprocess.Popen:
+        try:
+            return subprocess.Popen(['ninja', target], stdout=subprocess.PIPE)
+        except Exception:
+            print(palette.fail(f"Failed to read output of `ninja {target}`: please run ./configure.py first"))
+            raise
+
+    # Let ninja work in the background while the other options are processed.
+    # The ninja queries themselves run one after another, as each of them may
+    # regenerate build.ninja.
+    mode_list = None if args.modes else start_ninja('mode_list')
+
     if not args.jobs:
         if not args.cpus:
             nr_cpus = multiprocessing.cpu_count()
@@ -1167,37 +1366,39 @@ def parse_cmd_line() -> argparse.Namespace:
     if not output_is_a_tty:
         args.verbose = True
 
-    if not args.modes:
+    if mode_list:
         try:
-            out = subprocess.Popen(['ninja', 'mode_list'], stdout=subprocess.PIPE).communicate()[0].decode()
+            out = mode_list.communicate()[0].decode()
             # [1/1] List configured modes
             # debug release dev
-            args.modes = re.sub(r'.* List configured modes\n(.*)\n', r'\1',
-                                out, 1, re.DOTALL).split("\n")[-1].split(' ')
+            args.modes = ninja_mode_list_re.sub(r'\1', out, 1).split("\n")[-1].split(' ')
         except Exception:
             print(palette.fail("Failed to read output of `ninja mode_list`: please run ./configure.py first"))
             raise
 
-    def prepare_dir(dirname, pattern):
+    unit_test_list = start_ninja('unit_test_list')
+
+    def prepare_dir(dirname, *suffixes):
         # Ensure the dir exists
         pathlib.Path(dirname).mkdir(parents=True, exist_ok=True)
         # Remove old artifacts
-        for p in glob.glob(os.path.join(dirname, pattern), recursive=True):
-            pathlib.Path(p).unlink()
+        with os.scandir(dirname) as it:
+            for entry in it:
+                if entry.name.endswith(suffixes) and not entry.name.startswith("."):
+                    os.unlink(entry.path)
 
     args.tmpdir = os.path.abspath(args.tmpdir)
-    prepare_dir(args.tmpdir, "*.log")
+    prepare_dir(args.tmpdir, ".log")
 
     for mode in args.modes:
-        prepare_dir(os.path.join(args.tmpdir, mode), "*.log")
-        prepare_dir(os.path.join(args.tmpdir, mode), "*.reject")
-        prepare_dir(os.path.join(args.tmpdir, mode, "xml"), "*.xml")
+        prepare_dir(os.path.join(args.tmpdir, mode), ".log", ".reject")
+        prepare_dir(os.path.join(args.tmpdir, mode, "xml"), ".xml")
 
     # Get the list of tests configured by configure.py
     try:
-        out = subprocess.Popen(['ninja', 'unit_test_list'], stdout=subprocess.PIPE).communicate()[0].decode()
+        out = unit_test_list.communicate()[0].decode()
         # [1/1] List configured unit tests
-        args.tests = set(re.sub(r'.* List configured unit tests\n(.*)\n', r'\1', out, 1, re.DOTALL).split("\n"))
+        args.tests = set(ninja_unit_test_list_re.sub(r'\1', out, 1).split("\n"))
     except Exception:
         print(palette.fail("Failed to read output of `ninja unit_test_list`: please run ./configure.py first"))
         raise
@@ -1207,11 +1408,14 @@ def parse_cmd_line() -> argparse.Namespace:
 
 async def find_tests(options: argparse.Namespace) -> None:
 
-    for f in glob.glob(os.path.join("test", "*")):
-        if os.path.isdir(f) and os.path.isfile(os.path.join(f, "suite.yaml")):
-            for mode in options.modes:
-                suite = TestSuite.opt_create(f, options, mode)
-                await suite.add_test_list()
+    with os.scandir("test") as it:
+        suite_paths = [entry.path for entry in it
+                       if not entry.name.startswith(".") and entry.is_dir() and
+                       os.path.isfile(os.path.join(entry.path, "suite.yaml"))]
+    for f in suite_paths:
+        for mode in options.modes:
+            suite = TestSuite.opt_create(f, options, mode)
+            await suite.add_test_list()
 
     if not TestSuite.test_count():
         if len(options.name):
@@ -1228,59 +1432,62 @@ async def find_tests(options: argparse.Namespace) -> None:
 
 async def run_all_tests(signaled: asyncio.Event, options: argparse.Namespace) -> None:
     console = TabularConsoleOutput(options.verbose, TestSuite.test_count())
-    signaled_task = asyncio.create_task(signaled.wait())
-    pending = set([signaled_task])
+    # Run at most options.jobs tests at a time, in the order of the test list
+    jobs = asyncio.Semaphore(int(options.jobs))
+    tasks: List[asyncio.Task] = []
 
-    async def cancel(pending):
-        for task in pending:
-            task.cancel()
-        await asyncio.gather(*pending, return_exceptions=True)
-        print("... done.")
-        raise asyncio.CancelledError
+    async def run(test: Test) -> Test:
+        async with jobs:
+            return await test.suite.run(test, options)
 
-    async def reap(done, pending, signaled):
-        nonlocal console
-        if signaled.is_set():
-            await cancel(pending)
-        for coro in done:
-            result = coro.result()
-            if isinstance(result, bool):
-                continue    # skip signaled task result
-            console.print_progress(result)
+    async def cancel_on_signal() -> None:
+        await signaled.wait()
+        for task in tasks:
+            task.cancel()
 
     ms = MinioServer(options.tmpdir, TestSuite.hosts, LogPrefixAdapter(logging.getLogger('minio'), {'prefix': 'minio'}))
     await ms.start()
     TestSuite.artifacts.add_exit_artifact(None, ms.stop)
 
     console.print_start_blurb()
+    signaled_task = None
     try:
         TestSuite.artifacts.add_exit_artifact(None, TestSuite.hosts.cleanup)
-        for test in TestSuite.all_tests():
-            # +1 for 'signaled' event
-            if len(pending) > options.jobs:
-                # Wait for some task to finish
-                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
-                await reap(done, pending, signaled)
-            pending.add(asyncio.create_task(test.suite.run(test, options)))
-        # Wait & reap ALL tasks but signaled_task
-        # Do not use asyncio.ALL_COMPLETED to print a nice progress report
-        while len(pending) > 1:
-            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
-            await reap(done, pending, signaled)
-
+        tasks.extend(asyncio.create_task(run(test)) for test in TestSuite.all_tests())
+        signaled_task = asyncio.create_task(cancel_on_signal())
+        # Reap the tests as they finish to print a nice progress report
+        for next_done in asyncio.as_completed(tasks):
+            console.print_progress(await next_done)
     except asyncio.CancelledError:
+        if signaled.is_set():
+            await asyncio.gather(*tasks, return_exceptions=True)
+            print("... done.")
         return
     finally:
+        if signaled_task is not None:
+            signaled_task.cancel()
         await TestSuite.artifacts.cleanup_before_exit()
 
     console.print_end_blurb()
 
 
-def read_log(log_filename: pathlib.Path) -> str:
-    """Intelligently read test log output"""
+# Printing a huge log to the console helps no one, so only its end,
+# usually the most interesting part, is printed.
+CONSOLE_LOG_MAX_BYTES = 4 * 1024 * 1024
+
+
+def read_log(log_filename: pathlib.Path, max_bytes: Optional[int] = None) -> str:
+    """Intelligently read test log output. If max_bytes is given, only
+    the last max_bytes of the log are read."""
     try:
-        with log_filename.open("r") as log:
-            msg = log.read()
+        with log_filename.open("rb") as log:
+            size = os.fstat(log.fileno()).st_size
+            truncated = max_bytes is not None and size > max_bytes
+            if truncated:
+                log.seek(size - max_bytes)
+            msg = log.read().decode(errors="replace")
+            if truncated:
+                msg = "===Truncated, showing the last {} bytes===\n".format(max_bytes) + msg
             return msg if len(msg) else "===Empty log output==="
     except FileNotFoundError:
         return "===Log {} not found===".format(log_filename)
@@ -1300,54 +1507,90 @@ def print_summary(failed_tests, options: argparse.Namespace) -> None:
             len(failed_tests), TestSuite.test_count()))
 
 
+def files_equal(path1: Union[str, pathlib.Path], path2: Union[str, pathlib.Path],
+                bufsize: int = 1 << 20) -> bool:
+    """Compare the contents of two files, reading them in large chunks.
+    Files of different sizes are told apart without reading them."""
+    fd1 = os.open(path1, os.O_RDONLY)
+    try:
+        fd2 = os.open(path2, os.O_RDONLY)
+        try:
+            # Stat the open files rather than looking the paths up again
+            if os.fstat(fd1).st_size != os.fstat(fd2).st_size:
+                return False
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd1, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                os.posix_fadvise(fd2, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            buf1 = memoryview(bytearray(bufsize))
+            buf2 = memoryview(bytearray(bufsize))
+            while True:
+                n1 = os.readv(fd1, [buf1])
+                n2 = os.readv(fd2, [buf2])
+                if n1 != n2 or buf1[:n1] != buf2[:n2]:
+                    return False
+                if n1 == 0:
+                    return True
+        finally:
+            os.close(fd2)
+    finally:
+        os.close(fd1)
+
+
 def format_unidiff(fromfile: str, tofile: str) -> str:
+    # difflib needs random access to the lines, so both files are read
+    # whole, but only as much of the diff as is printed is computed
     with open(fromfile, "r") as frm, open(tofile, "r") as to:
-        buf = StringIO()
-        diff = difflib.unified_diff(
-            frm.readlines(),
-            to.readlines(),
-            fromfile=fromfile,
-            tofile=tofile,
-            fromfiledate=time.ctime(os.stat(fromfile).st_mtime),
-            tofiledate=time.ctime(os.stat(tofile).st_mtime),
-            n=10)           # Number of context lines
-
-        for i, line in enumerate(diff):
-            if i > 60:
-                break
-            if line.startswith('+'):
-                line = palette.diff_in(line)
-            elif line.startswith('-'):
-                line = palette.diff_out(line)
-            elif line.startswith('@'):
-                line = palette.diff_mark(line)
-            buf.write(line)
-        return buf.getvalue()
+        from_lines = frm.readlines()
+        to_lines = to.readlines()
+        fromfiledate = time.ctime(os.fstat(frm.fileno()).st_mtime)
+        tofiledate = time.ctime(os.fstat(to.fileno()).st_mtime)
+    buf = StringIO()
+    diff = difflib.unified_diff(
+        from_lines,
+        to_lines,
+        fromfile=fromfile,
+        tofile=tofile,
+        fromfiledate=fromfiledate,
+        tofiledate=tofiledate,
+        n=10)           # Number of context lines
+
+    for line in itertools.islice(diff, 61):
+        if line.startswith('+'):
+            line = palette.diff_in(line)
+        elif line.startswith('-'):
+            line = palette.diff_out(line)
+        elif line.startswith('@'):
+            line = palette.diff_mark(line)
+        buf.write(line)
+    return buf.getvalue()
 
 
 def write_junit_report(tmpdir: str, mode: str) -> None:
     junit_filename = os.path.join(tmpdir, mode, "xml", "junit.xml")
     total = 0
     failed = 0
-    xml_results = ET.Element("testsuite", name="non-boost tests", errors="0")
+    # Most tests succeed and produce an empty <testcase/>, so format these
+    # directly and build elements only for failure reports
+    testcases = []
     for suite in TestSuite.suites.values():
         for test in suite.junit_tests():
             if test.mode != mode:
                 continue
             total += 1
             # add the suite name to disambiguate tests named "run"
-            xml_res = ET.SubElement(xml_results, 'testcase',
-                                    name="{}.{}.{}.{}".format(test.suite.name, test.shortname, mode, test.id))
+            name = "{}.{}.{}.{}".format(test.suite.name, test.shortname, mode, test.id)
             if test.success is True:
+                testcases.append("<testcase name={} />".format(quoteattr(name)))
                 continue
             failed += 1
+            xml_res = ET.Element('testcase', name=name)
             test.write_junit_failure_report(xml_res)
+            testcases.append(ET.tostring(xml_res, encoding="unicode"))
     if total == 0:
         return
-    xml_results.set("tests", str(total))
-    xml_results.set("failures", str(failed))
-    with open(junit_filename, "w") as f:
-        ET.ElementTree(xml_results).write(f, encoding="unicode")
+    with open(junit_filename, "wb") as f:
+        f.write('<testsuite name="non-boost tests" errors="0" tests="{}" failures="{}">{}</testsuite>'.format(
+            total, failed, "".join(testcases)).encode("utf-8"))
 
 
 def write_consolidated_boost_junit_xml(tmpdir: str, mode: str) -> None:
@@ -1360,7 +1603,7 @@ def write_consolidated_boost_junit_xml(tmpdir: str, mode: str) -> None:
             if test_xml is not None:
                 xml.extend(test_xml.getroot().findall('.//TestSuite'))
     et = ET.ElementTree(xml)
-    et.write(f'{tmpdir}/{mode}/xml/boost.xunit.xml', encoding='unicode')
+    et.write(f'{tmpdir}/{mode}/xml/boost.xunit.xml', encoding='utf-8')
 
 
 def open_log(tmpdir: str, log_file_name: str, log_level: str) -> None:
@@ -1442,4 +1685,10 @@ if __name__ == "__main__":
     if sys.version_info < (3, 7):
         print("Python 3.7 or newer is required to run this program")
         sys.exit(-1)
+    try:
+        # Faster subprocess and pipe handling, if available
+        import uvloop    # type: ignore
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     sys.exit(asyncio.run(workaround_python26789()))
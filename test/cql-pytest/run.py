@@ -1,14 +1,16 @@
 #!/usr/bin/env python3
 
 import os
-import glob
 import sys
 import time
+import select
 import shutil
 import signal
+import subprocess
 import atexit
+import socket
 import tempfile
-import requests
+import concurrent.futures
 
 # run_with_temporary_dir() is a utility function for running a process, such
 # as Scylla, Cassandra or Redis, inside its own new temporary directory,
@@ -21,8 +23,18 @@ import requests
 # can put files in the directory (which already exists when it is called).
 # See below the example run_scylla_cmd.
 
+# The temporary directories are created under $TMPDIR. Setting it to a
+# tmpfs (e.g., TMPDIR=/dev/shm) avoids disk I/O for the server's data and
+# log, but we don't do this by default: /dev/shm is often small (64 MB in
+# a default Docker container), not enough for Scylla's commitlog.
+# The base directory is opened once, on first use by make_new_tempdir(),
+# so further directories are created relative to it without looking up its
+# path again. Scripts which never create a directory never open it.
+tmpdir = os.getenv('TMPDIR', '/tmp')
+tmpdir_fd = None
+
 def pid_to_dir(pid):
-    return os.path.join(os.getenv('TMPDIR', '/tmp'), 'scylla-test-'+str(pid))
+    return os.path.join(tmpdir, 'scylla-test-'+str(pid))
 
 def run_with_generated_dir(run_cmd_generator, run_dir_generator):
     global run_with_temporary_dir_pids
@@ -31,44 +43,52 @@ def run_with_generated_dir(run_cmd_generator, run_dir_generator):
     # started running but before we save this child's process id in
     # run_with_temporary_dir_pids. In that small time window, a signal may
     # kill the parent process but not cleanup the child. So we use sigmask
-    # to postpone signal delivery during that time window:
-    mask = signal.pthread_sigmask(signal.SIG_BLOCK, {})
-    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGINT, signal.SIGQUIT, signal.SIGTERM})
+    # to postpone signal delivery during that time window. SIGCHLD is
+    # postponed too, so the child's exit isn't noticed before its pid is
+    # recorded:
+    mask = signal.pthread_sigmask(signal.SIG_BLOCK,
+        {signal.SIGINT, signal.SIGQUIT, signal.SIGTERM, signal.SIGCHLD})
     sys.stdout.flush()
     sys.stderr.flush()
     pid = os.fork()
     if pid == 0:
         # Child
-        run_with_temporary_dir_pids = set() # no children to clean up on child
+        run_with_temporary_dir_pids = [] # no children to clean up on child
         run_pytest_pids = set()
         pid = os.getpid()
         dir = run_dir_generator(pid)
         (cmd, env) = run_cmd_generator(pid, dir)
         # redirect stdout and stderr to log file, as in a shell's >log 2>&1:
         log = os.path.join(dir, 'log')
-        fd = os.open(log, os.O_WRONLY | os.O_CREAT | os.O_APPEND, mode=0o666)
+        # The command generator may have printed something (e.g., "Booting
+        # Scylla..."), so flush it before replacing the descriptors. dup2()
+        # closes the old descriptors itself.
+        fd = os.open(log, os.O_WRONLY | os.O_CREAT | os.O_APPEND | os.O_CLOEXEC, mode=0o666)
         sys.stdout.flush()
-        os.close(1)
-        os.dup2(fd, 1)
         sys.stderr.flush()
-        os.close(2)
+        os.dup2(fd, 1)
         os.dup2(fd, 2)
+        os.close(fd)
         # Detach child from parent's "session", so that a SIGINT will be
         # delivered just to the parent, not to the child. Instead, the parent
         # will eventually deliver a SIGKILL as part of cleanup_all().
         os.setsid()
+        # Don't let the new program inherit the signals we blocked above
+        signal.pthread_sigmask(signal.SIG_SETMASK, mask)
         os.execve(cmd[0], cmd, dict(os.environ, **env))
         # execve will not return. If it cannot run the program, it will raise
         # an exception.
     # Parent
-    run_with_temporary_dir_pids.add(pid)
+    run_with_temporary_dir_pids.append(pid)
     signal.pthread_sigmask(signal.SIG_SETMASK, mask)
     return pid
 
 def make_new_tempdir(pid):
-    dir = pid_to_dir(pid)
-    os.mkdir(dir)
-    return dir
+    global tmpdir_fd
+    if tmpdir_fd is None:
+        tmpdir_fd = os.open(tmpdir, os.O_PATH | os.O_DIRECTORY | os.O_CLOEXEC)
+    os.mkdir('scylla-test-'+str(pid), dir_fd=tmpdir_fd)
+    return pid_to_dir(pid)
 
 def run_with_temporary_dir(run_cmd_generator):
     return run_with_generated_dir(run_cmd_generator, make_new_tempdir)
@@ -79,16 +99,19 @@ def restart_with_dir(old_pid, run_cmd_generator, dir):
         os.waitpid(old_pid, 0)
     except ProcessLookupError:
         pass
+    # The old process is reaped, so cleanup_all() must not kill it again:
+    # its pid may already belong to another process.
+    run_with_temporary_dir_pids.remove(old_pid)
 
     scylla_link = os.path.join(dir, 'test_scylla')
     os.unlink(scylla_link)
     return run_with_generated_dir(run_cmd_generator, lambda pid : dir)
 
-# run_with_temporary_dir_pids is a set of process ids previously created
+# run_with_temporary_dir_pids is a list of process ids previously created
 # by run_with_temporary_dir(). On exit, the processes listed here are
 # cleaned up. Note that there is a known mapping (pid_to_dir()) from each
 # pid to the temporary directory - which will also be removed.
-run_with_temporary_dir_pids = set()
+run_with_temporary_dir_pids = []
 
 # abort_run_with_temporary_dir() kills a process started earlier by
 # run_with_temporary_directory, and and removes its temporary directory.
@@ -96,35 +119,53 @@ run_with_temporary_dir_pids = set()
 # it to the standard output even after the directory is removed. In the
 # future we may want to change this - and save the log somewhere instead
 # of copying it to stdout.
-def abort_run_with_dir(pid, tmpdir):
+def abort_run_with_dir(pid, dir):
     try:
         os.killpg(pid, 9)
         os.waitpid(pid, 0) # don't leave an annoying zombie
-    except ProcessLookupError:
+    except (ProcessLookupError, ChildProcessError):
         pass
-    # We want to read tmpdir/log to stdout, but if stdout is piped, this can
+    # We want to read dir/log to stdout, but if stdout is piped, this can
     # take a long time and be interrupted. We don't want the rmtree() below
     # to not happen in that case. So we need to open the log file first,
     # delete the directory (the open file will not be really deleted unti we
     # close it) - and only then start showing the log file.
-    f = open(os.path.join(tmpdir, 'log'), 'rb')
+    f = open(os.path.join(dir, 'log'), 'rb')
     # Be paranoid about rmtree accidentally removing the entire disk...
-    # TODO: check tmpdir is actually in TMPDIR and refuse to remove it
+    # TODO: check dir is actually in TMPDIR and refuse to remove it
     # if not.
-    if tmpdir != '/':
-        shutil.rmtree(tmpdir)
+    if dir != '/':
+        shutil.rmtree(dir)
     return f
 
 def abort_run_with_temporary_dir(pid):
     return abort_run_with_dir(pid, pid_to_dir(pid))
 
 summary=''
+# Set by the caller when the tests passed, so cleanup_all() needn't show
+# the subprocesses' output logs.
+success = False
 run_pytest_pids = set()
 
+# Copy the rest of the open file f to stdout. sendfile() lets the kernel
+# do the copying, so a large log doesn't pass through Python's buffers.
+def copy_to_stdout(f):
+    sys.stdout.flush()
+    out = sys.stdout.fileno()
+    offset = f.tell()
+    size = os.fstat(f.fileno()).st_size
+    try:
+        while offset < size:
+            sent = os.sendfile(out, f.fileno(), offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+    except OSError:
+        # sendfile() may not support this kind of output
+        f.seek(offset)
+        shutil.copyfileobj(f, sys.stdout.buffer)
+
 def cleanup_all():
-    global summary
-    global run_with_temporary_dir_pids
-    global run_pytest_pids
     # Kill pytest first, before killing the tested server, so we don't
     # continue to get a barrage of errors when the test runs with the
     # server killed.
@@ -132,13 +173,22 @@ def cleanup_all():
         try:
             os.killpg(pid, 9)
             os.waitpid(pid, 0) # don't leave an annoying zombie
+        except (ProcessLookupError, ChildProcessError):
+            pass
+    # Then kill all the servers at once, in reverse order of starting, so
+    # they die in parallel rather than one after another. They are not
+    # reaped here: abort_run_with_temporary_dir() below reaps each of them,
+    # and as long as a killed process isn't reaped its pid can't be reused.
+    for pid in reversed(run_with_temporary_dir_pids):
+        try:
+            os.killpg(pid, 9)
         except ProcessLookupError:
             pass
-    for pid in run_with_temporary_dir_pids:
-        f = abort_run_with_temporary_dir(pid)
-        print('\nSubprocess output:\n')
-        sys.stdout.flush()
-        shutil.copyfileobj(f, sys.stdout.buffer)
+    for pid in reversed(run_with_temporary_dir_pids):
+        with abort_run_with_temporary_dir(pid) as f:
+            if not success:
+                print('\nSubprocess output:\n')
+                copy_to_stdout(f)
     scylla_set = set()
     print(summary)
 
@@ -150,7 +200,11 @@ atexit.register(cleanup_all)
 
 # If Python doesn't catch a particular signal, the atexit handler will not
 # get called. By default SIGINT is caught, but SIGTERM and SIGHUP are not,
-# so let's catch them explicitly:
+# so let's catch them explicitly. The handler exits right away instead of
+# just recording the signal (e.g., with signal.set_wakeup_fd()) for later:
+# most of the time the main thread is blocked in waitpid() for pytest, and
+# Python retries an interrupted waitpid() after running the handler, so
+# nothing would look at the recorded signal until the tests were done.
 for sig in [signal.SIGTERM, signal.SIGHUP]:
     signal.signal(sig, lambda sig, frame:
         sys.exit(f'Received signal {signal.Signals(sig).name}. Exiting.'))
@@ -168,8 +222,7 @@ for sig in [signal.SIGTERM, signal.SIGHUP]:
 # This gives us a total of 253*255*255 possible IP addresses - which is
 # significantly more than /proc/sys/kernel/pid_max on any system I know.
 def pid_to_ip(pid):
-    bytes = pid.to_bytes(3, byteorder='big')
-    return '127.' + str(bytes[0]+1) + '.' + str(bytes[1]) + '.' + str(bytes[2])
+    return f'127.{(pid >> 16) + 1}.{(pid >> 8) & 0xff}.{pid & 0xff}'
 
 ##############################
 
@@ -191,21 +244,91 @@ def find_scylla():
     if os.getenv('SCYLLA'):
         scylla = os.path.abspath(os.getenv('SCYLLA'))
     else:
-        scyllas = glob.glob(os.path.join(source_path, 'build/*/scylla'))
-        if not scyllas:
+        # Pick the most recently built build/*/scylla, with one stat each
+        latest_mtime = None
+        try:
+            with os.scandir(os.path.join(source_path, 'build')) as it:
+                for entry in it:
+                    if entry.name.startswith('.'):
+                        continue
+                    candidate = os.path.join(entry.path, 'scylla')
+                    try:
+                        mtime = os.stat(candidate).st_mtime
+                    except (FileNotFoundError, NotADirectoryError):
+                        continue
+                    if latest_mtime is None or mtime > latest_mtime:
+                        latest_mtime = mtime
+                        scylla = candidate
+        except FileNotFoundError:
+            pass
+        if not scylla:
             print("Can't find a Scylla executable in {}.\nPlease build Scylla or set SCYLLA to the path of a Scylla executable.".format(source_path))
             exit(1)
-        scylla = max(scyllas, key=os.path.getmtime)
     if not os.access(scylla, os.X_OK):
         print("Cannot execute '{}'.\nPlease set SCYLLA to the path of a Scylla executable.".format(scylla))
         exit(1)
     return scylla
 
+# The parts of the Scylla command line and environment which are the same
+# for every run_scylla_cmd() call. When running a Scylla build with
+# sanitizers enabled, we should configure them to fail on real errors, and
+# ignore spurious errors.
+scylla_env = {
+    'UBSAN_OPTIONS': f'halt_on_error=1:abort_on_error=1:suppressions={source_path}/ubsan-suppressions.supp',
+    'ASAN_OPTIONS': 'disable_coredump=0:abort_on_error=1:detect_stack_use_after_returns=1'
+}
+scylla_base_args = (
+    '--options-file',  source_path + '/conf/scylla.yaml',
+    '--developer-mode', '1',
+    '--ring-delay-ms', '0',
+    '--collectd', '0',
+    '--smp', '2',
+    '-m', '1G',
+    '--overprovisioned',
+    '--max-networking-io-control-blocks', '1000',
+    '--unsafe-bypass-fsync', '1',
+    '--kernel-page-cache', '1',
+    '--commitlog-use-o-dsync', '0',
+    '--flush-schema-tables-after-modification', 'false',
+    '--auto-snapshot', '0',
+    '--skip-wait-for-gossip-to-settle', '0',
+    '--logger-log-level', 'compaction=warn',
+    '--logger-log-level', 'migration_manager=warn',
+    # Use lower settings for some parameters to allow faster testing
+    '--num-tokens', '16',
+    '--query-tombstone-page-limit', '1000',
+    # Significantly increase default timeouts to allow running tests
+    # on a very slow setup (but without network losses). Note that these
+    # are server-side timeouts: The client should also avoid timing out
+    # its own requests - for this reason we increase the CQL driver's
+    # client-side timeout in conftest.py.
+    '--range-request-timeout-in-ms', '300000',
+    '--read-request-timeout-in-ms', '300000',
+    '--counter-write-request-timeout-in-ms', '300000',
+    '--cas-contention-timeout-in-ms', '300000',
+    '--truncate-request-timeout-in-ms', '300000',
+    '--write-request-timeout-in-ms', '300000',
+    '--request-timeout-in-ms', '300000',
+    # Allow testing experimental features. Following issue #9467, we need
+    # to add here specific experimental features as they are introduced.
+    # Note that Alternator-specific experimental features are listed in
+    # test/alternator/run.
+    '--experimental-features=udf',
+    '--experimental-features=keyspace-storage-options',
+    '--enable-user-defined-functions', '1',
+    # Set up authentication in order to allow testing this module
+    # and other modules dependent on it: e.g. service levels
+    '--authenticator', 'PasswordAuthenticator',
+    '--authorizer', 'CassandraAuthorizer',
+    '--strict-allow-filtering', 'true',
+    '--permissions-update-interval-in-ms', '100',
+    '--permissions-validity-in-ms', '100',
+)
+
 def run_scylla_cmd(pid, dir):
     ip = pid_to_ip(pid)
     print('Booting Scylla on ' + ip + ' in ' + dir + '...')
     global scylla
-    global source_path
     # To make things easier for users of "killall", "top", and similar,
     # we want the Scylla executable which we run during the test to have
     # a different name from manual runs of Scylla. Unfortunately, using
@@ -215,65 +338,14 @@ def run_scylla_cmd(pid, dir):
     # link is good enough.
     scylla_link = os.path.join(dir, 'test_scylla')
     os.symlink(scylla, scylla_link)
-    # When running a Scylla build with sanitizers enabled, we should
-    # configure them to fail on real errors, and ignore spurious errors.
-    env = {
-        'UBSAN_OPTIONS': f'halt_on_error=1:abort_on_error=1:suppressions={source_path}/ubsan-suppressions.supp',
-        'ASAN_OPTIONS': 'disable_coredump=0:abort_on_error=1:detect_stack_use_after_returns=1'
-    }
-    return ([scylla_link,
-        '--options-file',  source_path + '/conf/scylla.yaml',
-        '--developer-mode', '1',
-        '--ring-delay-ms', '0',
-        '--collectd', '0',
-        '--smp', '2',
-        '-m', '1G',
-        '--overprovisioned',
-        '--max-networking-io-control-blocks', '1000',
-        '--unsafe-bypass-fsync', '1',
-        '--kernel-page-cache', '1',
-        '--commitlog-use-o-dsync', '0',
-        '--flush-schema-tables-after-modification', 'false',
+    return ([scylla_link, *scylla_base_args,
         '--api-address', ip,
         '--rpc-address', ip,
         '--listen-address', ip,
         '--prometheus-address', ip,
         '--seed-provider-parameters', 'seeds=' + ip,
         '--workdir', dir,
-        '--auto-snapshot', '0',
-        '--skip-wait-for-gossip-to-settle', '0',
-        '--logger-log-level', 'compaction=warn',
-        '--logger-log-level', 'migration_manager=warn',
-        # Use lower settings for some parameters to allow faster testing
-        '--num-tokens', '16',
-        '--query-tombstone-page-limit', '1000',
-        # Significantly increase default timeouts to allow running tests
-        # on a very slow setup (but without network losses). Note that these
-        # are server-side timeouts: The client should also avoid timing out
-        # its own requests - for this reason we increase the CQL driver's
-        # client-side timeout in conftest.py.
-        '--range-request-timeout-in-ms', '300000',
-        '--read-request-timeout-in-ms', '300000',
-        '--counter-write-request-timeout-in-ms', '300000',
-        '--cas-contention-timeout-in-ms', '300000',
-        '--truncate-request-timeout-in-ms', '300000',
-        '--write-request-timeout-in-ms', '300000',
-        '--request-timeout-in-ms', '300000',
-        # Allow testing experimental features. Following issue #9467, we need
-        # to add here specific experimental features as they are introduced.
-        # Note that Alternator-specific experimental features are listed in
-        # test/alternator/run.
-        '--experimental-features=udf',
-        '--experimental-features=keyspace-storage-options',
-        '--enable-user-defined-functions', '1',
-        # Set up authentication in order to allow testing this module
-        # and other modules dependent on it: e.g. service levels
-        '--authenticator', 'PasswordAuthenticator',
-        '--authorizer', 'CassandraAuthorizer',
-        '--strict-allow-filtering', 'true',
-        '--permissions-update-interval-in-ms', '100',
-        '--permissions-validity-in-ms', '100',
-        ], env)
+        ], dict(scylla_env))
 
 # Same as run_scylla_cmd, just use SSL encryption for the CQL port (same
 # port number as default - replacing the unencrypted server)
@@ -305,6 +377,13 @@ def get_cql_cluster(ip, ssl_context=None):
 
 ## Test that CQL is serving, for wait_for_services() below.
 def check_cql(ip, ssl_context=None):
+    # Creating a Cluster is costly, and it can't be kept for the next retry
+    # because the driver shuts it down when its first connection fails. So
+    # first just check that the CQL port accepts connections at all.
+    try:
+        socket.create_connection((ip, 9042), timeout=1).close()
+    except OSError:
+        raise NotYetUp
     try:
         cluster = get_cql_cluster(ip, ssl_context)
         cluster.connect()
@@ -321,11 +400,11 @@ def check_ssl_cql(ip):
 # Test that the Scylla REST API is serving.
 # Can be used as a checker function with wait_for_services() below.
 def check_rest_api(ip, port=10000):
+    # The REST API is up once its port accepts connections - there is no
+    # need for an actual HTTP request (getting "/" returns 404 anyway).
     try:
-        requests.get(f"http://{ip}:{port}/")
-        # getting "/" returns error status 404 but we don't care
-        # as long as the server returns it
-    except requests.exceptions.ConnectionError:
+        socket.create_connection((ip, port), timeout=1).close()
+    except OSError:
         raise NotYetUp
     # Any other exception may indicate a problem, and is passed to the caller.
 
@@ -344,28 +423,58 @@ def check_rest_api(ip, port=10000):
 class NotYetUp(Exception):
     pass
 def wait_for_services(pid, checkers):
-    start_time = time.time()
+    # Use the monotonic clock, immune to wall-clock adjustments during a
+    # long boot, and compute the deadline once.
+    start_time = time.monotonic_ns()
+    deadline = start_time + 200_000_000_000
     ready = False
-    while time.time() < start_time + 200:
-        time.sleep(0.1)
-        # To check if Scylla died already (i.e., failed to boot), we need
-        # to first get rid of the zombie (if it exists) with waitpid, and
-        # then check if the process still exists, with kill.
-        try:
-            os.waitpid(pid, os.WNOHANG)
-            os.kill(pid, 0)
-        except (ProcessLookupError, ChildProcessError):
-            # Scylla is dead, we cannot recover
-            break
-        try:
-            for checker in checkers:
-                checker()
-            # If all checkers passed, we're finally done
-            ready = True
-            break
-        except NotYetUp:
-            pass
-    duration = str(round(time.time() - start_time, 1)) + ' seconds'
+    # A pidfd becomes readable as soon as the process exits, so polling it
+    # between retries notices Scylla's death immediately instead of on the
+    # next tick. Old kernels (before 5.3) don't have pidfd_open, and then we
+    # fall back to sleeping and checking the process with waitpid and kill.
+    try:
+        pidfd = os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        pidfd = None
+    else:
+        poller = select.poll()
+        poller.register(pidfd, select.POLLIN)
+    # Run the checkers in parallel, so that each retry takes as long as the
+    # slowest checker rather than all of them together.
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(checkers))
+    try:
+        while time.monotonic_ns() < deadline:
+            if pidfd is not None:
+                if poller.poll(100):
+                    # Scylla is dead, we cannot recover
+                    break
+            else:
+                time.sleep(0.1)
+                # To check if Scylla died already (i.e., failed to boot), we
+                # need to first get rid of the zombie (if it exists) with
+                # waitpid, and then check if the process still exists, with
+                # kill.
+                try:
+                    os.waitpid(pid, os.WNOHANG)
+                    os.kill(pid, 0)
+                except (ProcessLookupError, ChildProcessError):
+                    # Scylla is dead, we cannot recover
+                    break
+            try:
+                futures = [executor.submit(checker) for checker in checkers]
+                concurrent.futures.wait(futures)
+                for future in futures:
+                    future.result()
+                # If all checkers passed, we're finally done
+                ready = True
+                break
+            except NotYetUp:
+                pass
+    finally:
+        executor.shutdown()
+        if pidfd is not None:
+            os.close(pidfd)
+    duration = str(round((time.monotonic_ns() - start_time) / 1e9, 1)) + ' seconds'
     if not ready:
         print(f'Boot failed after {duration}.')
         # Run the checkers again, not catching NotYetUp, to show exception
@@ -381,31 +490,28 @@ def wait_for_cql(pid, ip):
     wait_for_services(pid, [lambda: check_cql(ip)])
 
 def run_pytest(pytest_dir, additional_parameters):
-    global run_with_temporary_dir_pids
-    global run_pytest_pids
     sys.stdout.flush()
     sys.stderr.flush()
-    pid = os.fork()
-    if pid == 0:
-        # child:
-        run_with_temporary_dir_pids = set() # no children to clean up on child
-        run_pytest_pids = set()
-        os.chdir(pytest_dir)
-        os.setsid()
-        os.execvp('pytest', ['pytest',
-            '-o', 'junit_family=xunit2'] + additional_parameters)
-        exit(1)
-    # parent:
-    run_pytest_pids.add(pid)
-    if os.waitpid(pid, 0)[1]:
-        return False
-    else:
-        return True
+    # Pass on the Scylla executable we found, if any, so that child
+    # processes which use this module skip the search
+    env = os.environ if scylla is None else dict(os.environ, SCYLLA=scylla)
+    # On Linux, subprocess starts the child with vfork() or posix_spawn(),
+    # so unlike fork() it doesn't copy our (possibly large) address space.
+    proc = subprocess.Popen(['pytest', '-o', 'junit_family=xunit2'] + additional_parameters,
+        cwd=pytest_dir, env=env, start_new_session=True)
+    run_pytest_pids.add(proc.pid)
+    returncode = proc.wait()
+    # Once reaped, the pid may be reused, so cleanup_all() mustn't kill it
+    run_pytest_pids.discard(proc.pid)
+    return returncode == 0
 
 # Set up self-signed SSL certificate in dir/scylla.key, dir/scylla.crt.
 # These can be used for setting up an HTTPS server for Alternator, or for
 # any other part of Scylla which needs SSL.
 def setup_ssl_certificate(dir):
-    # FIXME: error checking (if "openssl" isn't found, for example)
-    os.system(f'openssl genrsa 2048 > "{dir}/scylla.key"')
-    os.system(f'openssl req -new -x509 -nodes -sha256 -days 365 -subj "/C=IL/ST=None/L=None/O=None/OU=None/CN=example.com" -key "{dir}/scylla.key" -out "{dir}/scylla.crt"')
+    # A single openssl run generates both the key and the certificate.
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+        '-sha256', '-days', '365',
+        '-subj', '/C=IL/ST=None/L=None/O=None/OU=None/CN=example.com',
+        '-keyout', f'{dir}/scylla.key', '-out', f'{dir}/scylla.crt'],
+        check=True, stdout=subprocess.DEVNULL)
@@ -9,29 +9,36 @@ from util import new_test_keyspace, unique_name
 import pytest
 from cassandra.protocol import SyntaxException, AlreadyExists, InvalidRequest, ConfigurationException
 from threading import Thread
+from collections import Counter
+
+# The usual replication options for a test keyspace: RF=1 in this DC.
+@pytest.fixture(scope="module")
+def nts_rep(this_dc):
+    return f"WITH REPLICATION = {{ 'class' : 'NetworkTopologyStrategy', '{this_dc}' : 1 }}"
 
 # A basic tests for successful CREATE KEYSPACE and DROP KEYSPACE
-def test_create_and_drop_keyspace(cql, this_dc):
-    cql.execute("CREATE KEYSPACE test_create_and_drop_keyspace WITH REPLICATION = { 'class' : 'NetworkTopologyStrategy', '" + this_dc + "' : 1 }")
-    cql.execute("DROP KEYSPACE test_create_and_drop_keyspace")
+def test_create_and_drop_keyspace(cql, nts_rep):
+    keyspace = unique_name()
+    cql.execute(f"CREATE KEYSPACE {keyspace} {nts_rep}")
+    cql.execute(f"DROP KEYSPACE {keyspace}")
 
 # Trying to create the same keyspace - even if with identical parameters -
 # should result in an AlreadyExists error.
-def test_create_keyspace_twice(cql, this_dc):
-    cql.execute("CREATE KEYSPACE test_create_keyspace_twice WITH REPLICATION = { 'class' : 'NetworkTopologyStrategy', '" + this_dc + "' : 1 }")
-    with pytest.raises(AlreadyExists):
-        cql.execute("CREATE KEYSPACE test_create_keyspace_twice WITH REPLICATION = { 'class' : 'NetworkTopologyStrategy', '" + this_dc + "' : 1 }")
-    cql.execute("DROP KEYSPACE test_create_keyspace_twice")
+def test_create_keyspace_twice(cql, nts_rep):
+    with new_test_keyspace(cql, nts_rep) as keyspace:
+        with pytest.raises(AlreadyExists):
+            cql.execute(f"CREATE KEYSPACE {keyspace} {nts_rep}")
 
 # "IF NOT EXISTS" on CREATE KEYSPACE:
-def test_create_keyspace_if_not_exists(cql, this_dc):
-    cql.execute("CREATE KEYSPACE IF NOT EXISTS test_create_keyspace_if_not_exists WITH REPLICATION = { 'class' : 'NetworkTopologyStrategy', '" + this_dc + "' : 1 }")
+def test_create_keyspace_if_not_exists(cql, this_dc, nts_rep):
+    keyspace = unique_name()
+    cql.execute(f"CREATE KEYSPACE IF NOT EXISTS {keyspace} {nts_rep}")
     # A second invocation with IF NOT EXISTS is fine:
-    cql.execute("CREATE KEYSPACE IF NOT EXISTS test_create_keyspace_if_not_exists WITH REPLICATION = { 'class' : 'NetworkTopologyStrategy', '" + this_dc + "' : 1 }")
+    cql.execute(f"CREATE KEYSPACE IF NOT EXISTS {keyspace} {nts_rep}")
     # It doesn't matter if the second invocation has different parameters,
     # they are ignored.
-    cql.execute("CREATE KEYSPACE IF NOT EXISTS test_create_keyspace_if_not_exists WITH REPLICATION = { 'class' : 'NetworkTopologyStrategy', '" + this_dc + "' : 2 }")
-    cql.execute("DROP KEYSPACE test_create_keyspace_if_not_exists")
+    cql.execute(f"CREATE KEYSPACE IF NOT EXISTS {keyspace} WITH REPLICATION = {{ 'class' : 'NetworkTopologyStrategy', '{this_dc}' : 2 }}")
+    cql.execute(f"DROP KEYSPACE {keyspace}")
 
 # The "WITH REPLICATION" part of CREATE KEYSPACE may not be ommitted - trying
 # to do so should result in a syntax error:
@@ -43,31 +50,34 @@ def test_create_keyspace_missing_with(cql):
 # numeric characters and contain underscores; only letters and numbers are
 # supported as the first character.". This is not accurate. Test what is actually
 # enforced:
-def test_create_keyspace_invalid_name(cql, this_dc):
-    rep = " WITH REPLICATION = { 'class' : 'NetworkTopologyStrategy', '" + this_dc + "' : 1 }"
-    with pytest.raises(InvalidRequest, match='48'):
-        cql.execute('CREATE KEYSPACE ' + 'x'*49 + rep)
+@pytest.mark.parametrize("name,exception,match", [
+    ('x'*49, InvalidRequest, '48'),
     # The name xyz!123, unquoted, is a syntax error. With quotes it's valid
     # syntax, but an illegal name.
-    with pytest.raises(SyntaxException):
-        cql.execute('CREATE KEYSPACE xyz!123' + rep)
-    with pytest.raises(InvalidRequest, match='name'):
-        cql.execute('CREATE KEYSPACE "xyz!123"' + rep)
-    # The documentation claims that only letters and numbers - i.e., not
-    # underscores - are allowed as the first character of a table name.
-    # This is not, in fact, true... Although an unquoted name beginning
-    # with an underscore results in a syntax error in the parser, it quotes
-    # such names *are* allowed:
-    with pytest.raises(SyntaxException):
-        cql.execute('CREATE KEYSPACE _xyz' + rep)
-    cql.execute('CREATE KEYSPACE "_xyz"' + rep)
-    cql.execute('DROP KEYSPACE "_xyz"')
-    # As the documentation states, a keyspace name may begin with a number.
-    # But such a name is not allowed by the parser, so it needs to be quoted:
-    with pytest.raises(SyntaxException):
-        cql.execute('CREATE KEYSPACE 123' + rep)
-    cql.execute('CREATE KEYSPACE "123"' + rep)
-    cql.execute('DROP KEYSPACE "123"')
+    ('xyz!123', SyntaxException, None),
+    ('"xyz!123"', InvalidRequest, 'name'),
+    # An unquoted name beginning with an underscore, or with a number, is a
+    # syntax error in the parser. See test_create_keyspace_quoted_name below
+    # for quoted names beginning with them.
+    ('_xyz', SyntaxException, None),
+    ('123', SyntaxException, None),
+])
+def test_create_keyspace_invalid_name(cql, nts_rep, name, exception, match):
+    with pytest.raises(exception, match=match):
+        cql.execute(f'CREATE KEYSPACE {name} {nts_rep}')
+
+# The documentation claims that only letters and numbers - i.e., not
+# underscores - are allowed as the first character of a table name.
+# This is not, in fact, true... Although an unquoted name beginning
+# with an underscore results in a syntax error in the parser, it quotes
+# such names *are* allowed.
+# As the documentation states, a keyspace name may begin with a number.
+# But such a name is not allowed by the parser, so it needs to be quoted.
+@pytest.mark.parametrize("first", ['_', '123'])
+def test_create_keyspace_quoted_name(cql, nts_rep, first):
+    keyspace = f'"{first}{unique_name()}"'
+    cql.execute(f'CREATE KEYSPACE {keyspace} {nts_rep}')
+    cql.execute(f'DROP KEYSPACE {keyspace}')
 
 # Test trying to ALTER a keyspace with invalid options.
 # Reproduces #7595.
@@ -88,22 +98,24 @@ def test_create_keyspace_double_with(cql):
 # This test demonstrates a change of the exception produced between Cassandra 4.0
 # and earlier versions (with Scylla behaving like the earlier versions).
 def test_drop_keyspace_nonexistent(cql):
-    cql.execute('DROP KEYSPACE IF EXISTS nonexistent_keyspace')
+    # A unique name, so the keyspace surely doesn't exist
+    keyspace = unique_name()
+    cql.execute(f'DROP KEYSPACE IF EXISTS {keyspace}')
     # Cassandra changed the exception it throws on dropping a nonexistent keyspace.
     # Prior to Cassandra 4.0 (commit 207c80c1fd63dfbd8ca7e615ec8002ee8983c5d6, Nov. 2016)
     # it was a ConfigurationException, but in 4.0, it changed to and InvalidRequest.
     # In Sylla, it remains a ConfigurationException is it was in earlier Cassandra.
     with pytest.raises( (InvalidRequest, ConfigurationException) ):
-        cql.execute('DROP KEYSPACE nonexistent_keyspace')
+        cql.execute(f'DROP KEYSPACE {keyspace}')
 
 # Test trying to ALTER a keyspace.
-def test_alter_keyspace(cql, this_dc):
-    with new_test_keyspace(cql, "WITH REPLICATION = { 'class' : 'NetworkTopologyStrategy', '" + this_dc + "' : 1 }") as keyspace:
+def test_alter_keyspace(cql, this_dc, nts_rep):
+    with new_test_keyspace(cql, nts_rep) as keyspace:
         cql.execute(f"ALTER KEYSPACE {keyspace} WITH REPLICATION = {{ 'class' : 'NetworkTopologyStrategy', '{this_dc}' : 3 }} AND DURABLE_WRITES = false")
 
 # Test trying to ALTER a keyspace with invalid options.
-def test_alter_keyspace_invalid(cql, this_dc):
-    with new_test_keyspace(cql, "WITH REPLICATION = { 'class' : 'NetworkTopologyStrategy', '" + this_dc + "' : 1 }") as keyspace:
+def test_alter_keyspace_invalid(cql, nts_rep):
+    with new_test_keyspace(cql, nts_rep) as keyspace:
         with pytest.raises(ConfigurationException):
             cql.execute(f"ALTER KEYSPACE {keyspace} WITH REPLICATION = {{ 'class' : 'NoSuchStrategy' }}")
         # SimpleStrategy, if not outright forbidden, requires a
@@ -115,16 +127,15 @@ def test_alter_keyspace_invalid(cql, this_dc):
 
 # Test trying to ALTER a keyspace with invalid options.
 # Reproduces #7595.
-def test_alter_keyspace_nonexistent_dc(cql, this_dc):
-    with new_test_keyspace(cql, "WITH REPLICATION = { 'class' : 'NetworkTopologyStrategy', '" + this_dc + "' : 1 }") as keyspace:
+def test_alter_keyspace_nonexistent_dc(cql, nts_rep):
+    with new_test_keyspace(cql, nts_rep) as keyspace:
         with pytest.raises(ConfigurationException):
             cql.execute(f"ALTER KEYSPACE {keyspace} WITH replication = {{ 'class' : 'NetworkTopologyStrategy', 'nonexistentdc' : 1 }}")
 
 # Test trying to ALTER a non-existing keyspace
-def test_alter_keyspace_nonexisting(cql, this_dc):
-    cql.execute('DROP KEYSPACE IF EXISTS nonexistent_keyspace')
+def test_alter_keyspace_nonexisting(cql, nts_rep):
     with pytest.raises(InvalidRequest):
-        cql.execute("ALTER KEYSPACE nonexistent_keyspace WITH REPLICATION = { 'class' : 'NetworkTopologyStrategy', '" + this_dc + "' : 1 }")
+        cql.execute(f"ALTER KEYSPACE {unique_name()} {nts_rep}")
 
 # Test that attempts to reproduce an issue with double WITH keyword in ALTER
 # KEYSPACE statement -- CASSANDRA-9565.
@@ -142,8 +153,8 @@ def test_alter_keyspace_double_with(cql):
 # deleted. But we expect that at the end of the test the database remains in
 # some valid state - the keyspace should either exist or not exist. It
 # shouldn't be in some broken immortal state as reported in issue #8968.
-def test_concurrent_create_and_drop_keyspace(cql, this_dc, fails_without_consistent_cluster_management):
-    ksdef = "WITH REPLICATION = { 'class' : 'NetworkTopologyStrategy', '" + this_dc + "' : 1 }"
+def test_concurrent_create_and_drop_keyspace(cql, nts_rep, fails_without_consistent_cluster_management):
+    ksdef = nts_rep
     cfdef = "(a int PRIMARY KEY)"
     with new_test_keyspace(cql, ksdef) as keyspace:
         # The more iterations we do, the higher the chance of reproducing
@@ -151,31 +162,38 @@ def test_concurrent_create_and_drop_keyspace(cql, this_dc, fails_without_consist
         # Lower numbers have some chance of not catching the bug. If this
         # issue starts to xpass, we may need to increase the count.
         count = 40
+        # The outcomes are only counted while the threads run, and printed
+        # after they finish: printing would serialize the two threads on
+        # the stdout lock, making the race less likely.
+        drop_results = Counter()
+        create_results = Counter()
         def drops(count):
             for i in range(count):
                 try:
                     cql.execute(f"DROP KEYSPACE {keyspace}")
-                except Exception as e: print(e)
-                else: print("drop successful")
+                except Exception as e: drop_results[type(e).__name__] += 1
+                else: drop_results["drop successful"] += 1
         def creates(count):
             for i in range(count):
                 try:
                     cql.execute(f"CREATE KEYSPACE {keyspace} {ksdef}")
-                    print("create keyspace successful")
+                    create_results["create keyspace successful"] += 1
                     # Create a table in this keyspace. This creation may
                     # race with deletion of the entire keyspace by the
                     # parallel thread. Reproducing #8968 requires this
                     # operation - just creating and deleting the keyspace
                     # without anything in it did not reproduce the problem.
                     cql.execute(f"CREATE TABLE {keyspace}.xyz {cfdef}")
-                except Exception as e: print(e)
-                else: print("create table successful")
+                except Exception as e: create_results[type(e).__name__] += 1
+                else: create_results["create table successful"] += 1
         t1 = Thread(target=drops, args=[count])
         t2 = Thread(target=creates, args=[count])
         t1.start()
         t2.start()
         t1.join()
         t2.join()
+        print(f"drops: {dict(drop_results)}")
+        print(f"creates: {dict(create_results)}")
         # At this point, the keyspace should either exist, or not exist.
         # So CREATE KEYSPACE IF NOT EXIST should ensure it does exist,
         # and then one DROP KEYSPACE should succeed, a second one should
@@ -6,9 +6,10 @@
 # Tests for the tools hosted by scylla
 #############################################################################
 
-import contextlib
-import glob
+import collections
+import concurrent.futures
 import json
+import logging
 import nodetool
 import os
 import pytest
@@ -17,6 +18,9 @@ import tempfile
 import random
 import shutil
 import util
+from cassandra.concurrent import execute_concurrent
+
+logger = logging.getLogger(__name__)
 
 # To run the Scylla tools, we need to run Scylla executable itself, so we
 # need to find the path of the executable that was used to run Scylla for
@@ -25,8 +29,11 @@ import util
 # If such a process exists, we verify that it is Scylla, and return the
 # executable's path. If we can't find the Scylla executable we use
 # pytest.skip() to skip tests relying on this executable.
-@pytest.fixture(scope="module")
-def scylla_path(cql):
+# When running in parallel with pytest-xdist, the first worker to verify the
+# executable records it in the temporary directory shared by all workers, so
+# the others don't have to start it again.
+@pytest.fixture(scope="session")
+def scylla_path(cql, tmp_path_factory):
     pid = util.local_process_id(cql)
     if not pid:
         pytest.skip("Can't find local Scylla process")
@@ -35,12 +42,24 @@ def scylla_path(cql):
         path = os.readlink(f'/proc/{pid}/exe')
     except:
         pytest.skip("Can't find local Scylla executable")
+    verified_file = None
+    if os.getenv('PYTEST_XDIST_WORKER'):
+        verified_file = tmp_path_factory.getbasetemp().parent / "scylla_path_verified"
+        try:
+            if os.path.samefile(verified_file.read_text(), path):
+                return path
+        except OSError:
+            pass
     # Confirm that this executable is a real tool-providing Scylla by trying
     # to run it with the "--list-tools" option
     try:
         subprocess.check_output([path, '--list-tools'])
     except:
         pytest.skip("Local server isn't Scylla")
+    if verified_file:
+        tmp_file = verified_file.with_name(f"{verified_file.name}.{os.getpid()}")
+        tmp_file.write_text(path)
+        os.replace(tmp_file, verified_file)
     return path
 
 # A fixture for finding Scylla's data directory. We get it using the CQL
@@ -49,7 +68,7 @@ def scylla_path(cql):
 # exists on the local machine... However, if the same test that uses this
 # fixture also uses the scylla_path fixture, the test will anyway be skipped
 # if the running Scylla is not on the local machine local.
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def scylla_data_dir(cql):
     try:
         dir = json.loads(cql.execute("SELECT value FROM system.config WHERE name = 'data_file_directories'").one().value)[0]
@@ -58,24 +77,63 @@ def scylla_data_dir(cql):
         pytest.skip("Can't find Scylla sstable directory")
 
 
+# The table factories below collect their writes and send them concurrently
+# instead of waiting for each write before sending the next one. The order
+# of the writes is still respected: the driver assigns client-side timestamps
+# in submission order, so e.g. rows written after a range tombstone covering
+# them are still live. The writes collected so far must complete before the
+# table is flushed.
+def execute_concurrently(cql, statements):
+    execute_concurrent(cql, statements, concurrency=64, raise_on_first_error=True)
+
+
+def check_json_output(args, **kwargs):
+    """ Runs the command and returns its output, parsed as JSON. """
+    return json.loads(subprocess.check_output(args, **kwargs))
+
+
+def find_sstables(data_dir, keyspace, table):
+    """ Returns the Data.db components of the sstables of the given table.
+
+    Equivalent to globbing {data_dir}/{keyspace}/{table}-*/*-Data.db, but
+    lists each directory only once and does plain prefix and suffix
+    comparisons instead of pattern matching.
+    """
+    prefix = table + "-"
+    sstables = []
+    with os.scandir(os.path.join(data_dir, keyspace)) as it:
+        table_dirs = [e.path for e in it if e.name.startswith(prefix) and e.is_dir()]
+    for table_dir in table_dirs:
+        with os.scandir(table_dir) as it:
+            sstables += [e.path for e in it if e.name.endswith("-Data.db")]
+    return sstables
+
+
 def simple_no_clustering_table(cql, keyspace):
     table = util.unique_name()
     schema = f"CREATE TABLE {keyspace}.{table} (pk int PRIMARY KEY, v int) WITH compaction = {{'class': 'NullCompactionStrategy'}}"
 
     cql.execute(schema)
 
+    delete_partition = cql.prepare(f"DELETE FROM {keyspace}.{table} WHERE pk = ?")
+    insert_row = cql.prepare(f"INSERT INTO {keyspace}.{table} (pk, v) VALUES (?, 0)")
+
+    statements = []
     for pk in range(0, 10):
         x = random.randrange(0, 4)
         if x == 0:
             # partition tombstone
-            cql.execute(f"DELETE FROM {keyspace}.{table} WHERE pk = {pk}")
+            statements.append((delete_partition, (pk,)))
         else:
             # live row
-            cql.execute(f"INSERT INTO {keyspace}.{table} (pk, v) VALUES ({pk}, 0)")
+            statements.append((insert_row, (pk,)))
 
         if pk == 5:
+            execute_concurrently(cql, statements)
+            statements = []
             nodetool.flush(cql, f"{keyspace}.{table}")
 
+    execute_concurrently(cql, statements)
     nodetool.flush(cql, f"{keyspace}.{table}")
 
     return table, schema
@@ -87,31 +145,42 @@ def simple_clustering_table(cql, keyspace):
 
     cql.execute(schema)
 
+    insert_row_ttl = cql.prepare(f"INSERT INTO {keyspace}.{table} (pk1, pk2, ck1, ck2, v) VALUES (?, ?, ?, ?, 0) USING TTL 6000")
+    delete_row = cql.prepare(f"DELETE FROM {keyspace}.{table} WHERE pk1 = ? AND pk2 = ? AND ck1 = ? AND ck2 = ?")
+    delete_cell = cql.prepare(f"DELETE v FROM {keyspace}.{table} WHERE pk1 = ? AND pk2 = ? AND ck1 = ? AND ck2 = ?")
+    delete_range = cql.prepare(f"DELETE FROM {keyspace}.{table} WHERE pk1 = ? AND pk2 = ? AND ck1 > ? AND ck1 < ?")
+    insert_row = cql.prepare(f"INSERT INTO {keyspace}.{table} (pk1, pk2, ck1, ck2, v) VALUES (?, ?, ?, ?, 0)")
+    update_static = cql.prepare(f"UPDATE {keyspace}.{table} SET s = 10 WHERE pk1 = ? AND pk2 = ?")
+
+    statements = []
     for pk in range(0, 10):
         for ck in range(0, 10):
             x = random.randrange(0, 8)
             if x == 0:
                 # ttl
-                cql.execute(f"INSERT INTO {keyspace}.{table} (pk1, pk2, ck1, ck2, v) VALUES ({pk}, {pk}, {ck}, {ck}, 0) USING TTL 6000")
+                statements.append((insert_row_ttl, (pk, pk, ck, ck)))
             elif x == 1:
                 # row tombstone
-                cql.execute(f"DELETE FROM {keyspace}.{table} WHERE pk1 = {pk} AND pk2 = {pk} AND ck1 = {ck} AND ck2 = {ck}")
+                statements.append((delete_row, (pk, pk, ck, ck)))
             elif x == 2:
                 # cell tombstone
-                cql.execute(f"DELETE v FROM {keyspace}.{table} WHERE pk1 = {pk} AND pk2 = {pk} AND ck1 = {ck} AND ck2 = {ck}")
+                statements.append((delete_cell, (pk, pk, ck, ck)))
             elif x == 3:
                 # range tombstone
                 l = ck * 10
                 u = ck * 11
-                cql.execute(f"DELETE FROM {keyspace}.{table} WHERE pk1 = {pk} AND pk2 = {pk} AND ck1 > {l} AND ck1 < {u}")
+                statements.append((delete_range, (pk, pk, l, u)))
             else:
                 # live row
-                cql.execute(f"INSERT INTO {keyspace}.{table} (pk1, pk2, ck1, ck2, v) VALUES ({pk}, {pk}, {ck}, {ck}, 0)")
+                statements.append((insert_row, (pk, pk, ck, ck)))
 
         if pk == 5:
-            cql.execute(f"UPDATE {keyspace}.{table} SET s = 10 WHERE pk1 = {pk} AND pk2 = {pk}")
+            statements.append((update_static, (pk, pk)))
+            execute_concurrently(cql, statements)
+            statements = []
             nodetool.flush(cql, f"{keyspace}.{table}")
 
+    execute_concurrently(cql, statements)
     nodetool.flush(cql, f"{keyspace}.{table}")
 
     return table, schema
@@ -123,16 +192,23 @@ def clustering_table_with_collection(cql, keyspace):
 
     cql.execute(schema)
 
+    # The rows are written as CQL literals rather than bound values, as the
+    # map literals have duplicate keys and it's up to the server to pick
+    # the value that is stored.
+    statements = []
     for pk in range(0, 10):
         for ck in range(0, 10):
             map_vals = {f"{p}: '{c}'" for p in range(0, pk) for c in range(0, ck)}
             map_str = ", ".join(map_vals)
             set_list_vals = list(range(0, pk))
             set_list_str = ", ".join(map(str, set_list_vals))
-            cql.execute(f"INSERT INTO {keyspace}.{table} (pk, ck, v1, v2, v3) VALUES ({pk}, {ck}, {{{map_str}}}, {{{set_list_str}}}, [{set_list_str}])")
+            statements.append((f"INSERT INTO {keyspace}.{table} (pk, ck, v1, v2, v3) VALUES ({pk}, {ck}, {{{map_str}}}, {{{set_list_str}}}, [{set_list_str}])", ()))
         if pk == 5:
+            execute_concurrently(cql, statements)
+            statements = []
             nodetool.flush(cql, f"{keyspace}.{table}")
 
+    execute_concurrently(cql, statements)
     nodetool.flush(cql, f"{keyspace}.{table}")
 
     return table, schema
@@ -146,12 +222,18 @@ def clustering_table_with_udt(cql, keyspace):
     cql.execute(create_type_schema)
     cql.execute(create_table_schema)
 
+    insert_row = cql.prepare(f"INSERT INTO {keyspace}.{table} (pk, ck, v) VALUES (?, ?, {{f1: 100, f2: 'asd'}})")
+
+    statements = []
     for pk in range(0, 10):
         for ck in range(0, 10):
-            cql.execute(f"INSERT INTO {keyspace}.{table} (pk, ck, v) VALUES ({pk}, {ck}, {{f1: 100, f2: 'asd'}})")
+            statements.append((insert_row, (pk, ck)))
         if pk == 5:
+            execute_concurrently(cql, statements)
+            statements = []
             nodetool.flush(cql, f"{keyspace}.{table}")
 
+    execute_concurrently(cql, statements)
     nodetool.flush(cql, f"{keyspace}.{table}")
 
     return table, "; ".join((create_type_schema, create_table_schema))
@@ -163,32 +245,58 @@ def table_with_counters(cql, keyspace):
 
     cql.execute(schema)
 
+    increment = cql.prepare(f"UPDATE {keyspace}.{table} SET v = v + 1 WHERE pk = ?")
+
+    # Counter increments commute, so they can be sent concurrently too.
+    statements = []
     for pk in range(0, 10):
         for c in range(0, 4):
-            cql.execute(f"UPDATE {keyspace}.{table} SET v = v + 1 WHERE pk = {pk};")
+            statements.append((increment, (pk,)))
         if pk == 5:
+            execute_concurrently(cql, statements)
+            statements = []
             nodetool.flush(cql, f"{keyspace}.{table}")
 
+    execute_concurrently(cql, statements)
     nodetool.flush(cql, f"{keyspace}.{table}")
 
     return table, schema
 
 
-@contextlib.contextmanager
-def scylla_sstable(table_factory, cql, ks, data_dir):
-    table, schema = table_factory(cql, ks)
+# A fixture returning a function which, given a table factory, creates the
+# table, and returns the schema file and the sstables of the table.
+# The tests only read the sstables, so each table is only created once and
+# shared by all the tests using the same table factory - instead of creating
+# it again for every combination of their parameters. The tables are dropped
+# at the end of the module. The schema files are written to a private
+# temporary directory, removed as a whole at the end of the module.
+@pytest.fixture(scope="module")
+def scylla_sstable(cql, test_keyspace, scylla_data_dir):
+    tables = {}
+    schema_dir = tempfile.TemporaryDirectory()
+
+    def get(table_factory):
+        if table_factory not in tables:
+            table, schema = table_factory(cql, test_keyspace)
 
-    schema_file = os.path.join(data_dir, "..", "test_tools_schema.cql")
-    with open(schema_file, "w") as f:
-        f.write(schema)
+            schema_file = os.path.join(schema_dir.name, f"{table}.cql")
+            with open(schema_file, "w") as f:
+                f.write(schema)
 
-    sstables = glob.glob(os.path.join(data_dir, ks, table + '-*', '*-Data.db'))
+            sstables = find_sstables(scylla_data_dir, test_keyspace, table)
+            tables[table_factory] = (table, schema_file, sstables)
+        _, schema_file, sstables = tables[table_factory]
+        # A copy, so a test modifying its list can't affect the next tests.
+        return schema_file, list(sstables)
 
     try:
-        yield (schema_file, sstables)
+        yield get
     finally:
-        cql.execute(f"DROP TABLE {ks}.{table}")
-        os.unlink(schema_file)
+        try:
+            for table, _, _ in tables.values():
+                cql.execute(f"DROP TABLE {test_keyspace}.{table}")
+        finally:
+            schema_dir.cleanup()
 
 
 def one_sstable(sstables):
@@ -203,11 +311,11 @@ def all_sstables(sstables):
 
 @pytest.mark.parametrize("what", ["index", "compression-info", "summary", "statistics", "scylla-metadata"])
 @pytest.mark.parametrize("which_sstables", [one_sstable, all_sstables])
-def test_scylla_sstable_dump_component(cql, test_keyspace, scylla_path, scylla_data_dir, what, which_sstables):
-    with scylla_sstable(simple_clustering_table, cql, test_keyspace, scylla_data_dir) as (schema_file, sstables):
-        out = subprocess.check_output([scylla_path, "sstable", f"dump-{what}", "--schema-file", schema_file] + which_sstables(sstables))
+def test_scylla_sstable_dump_component(scylla_path, scylla_sstable, what, which_sstables):
+    schema_file, sstables = scylla_sstable(simple_clustering_table)
+    out = subprocess.check_output([scylla_path, "sstable", f"dump-{what}", "--schema-file", schema_file] + which_sstables(sstables))
 
-    print(out)
+    logger.debug("%s", out)
 
     assert out
     assert json.loads(out)
@@ -222,14 +330,14 @@ def test_scylla_sstable_dump_component(cql, test_keyspace, scylla_path, scylla_d
 ])
 @pytest.mark.parametrize("merge", [True, False])
 @pytest.mark.parametrize("output_format", ["text", "json"])
-def test_scylla_sstable_dump_data(cql, test_keyspace, scylla_path, scylla_data_dir, table_factory, merge, output_format):
-    with scylla_sstable(simple_clustering_table, cql, test_keyspace, scylla_data_dir) as (schema_file, sstables):
-        args = [scylla_path, "sstable", "dump-data", "--schema-file", schema_file, "--output-format", output_format]
-        if merge:
-            args.append("--merge")
-        out = subprocess.check_output(args + sstables)
+def test_scylla_sstable_dump_data(scylla_path, scylla_sstable, table_factory, merge, output_format):
+    schema_file, sstables = scylla_sstable(table_factory)
+    args = [scylla_path, "sstable", "dump-data", "--schema-file", schema_file, "--output-format", output_format]
+    if merge:
+        args.append("--merge")
+    out = subprocess.check_output(args + sstables)
 
-    print(out)
+    logger.debug("%s", out)
 
     assert out
     if output_format == "json":
@@ -240,28 +348,26 @@ def test_scylla_sstable_dump_data(cql, test_keyspace, scylla_path, scylla_data_d
         simple_no_clustering_table,
         simple_clustering_table,
 ])
-def test_scylla_sstable_write(cql, test_keyspace, scylla_path, scylla_data_dir, table_factory):
-    with scylla_sstable(table_factory, cql, test_keyspace, scylla_data_dir) as (schema_file, sstables):
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            dump_common_args = [scylla_path, "sstable", "dump-data", "--schema-file", schema_file, "--output-format", "json", "--merge"]
-            generation = util.unique_key_int()
+def test_scylla_sstable_write(scylla_path, scylla_sstable, table_factory):
+    schema_file, sstables = scylla_sstable(table_factory)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dump_common_args = [scylla_path, "sstable", "dump-data", "--schema-file", schema_file, "--output-format", "json", "--merge"]
+        generation = util.unique_key_int()
 
-            original_out = subprocess.check_output(dump_common_args + sstables)
-            original_json = json.loads(original_out)["sstables"]["anonymous"]
+        original_json = check_json_output(dump_common_args + sstables)["sstables"]["anonymous"]
 
-            input_file = os.path.join(tmp_dir, 'input.json')
+        input_file = os.path.join(tmp_dir, 'input.json')
 
-            with open(input_file, 'w') as f:
-                json.dump(original_json, f)
+        with open(input_file, 'wb') as f:
+            f.write(json.dumps(original_json, separators=(',', ':')).encode())
 
-            subprocess.check_call([scylla_path, "sstable", "write", "--schema-file", schema_file, "--input-file", input_file, "--output-dir", tmp_dir, "--generation", str(generation), '--logger-log-level', 'scylla-sstable=trace'])
+        subprocess.check_call([scylla_path, "sstable", "write", "--schema-file", schema_file, "--input-file", input_file, "--output-dir", tmp_dir, "--generation", str(generation), '--logger-log-level', 'scylla-sstable=trace'])
 
-            sstable_file = os.path.join(tmp_dir, f"me-{generation}-big-Data.db")
+        sstable_file = os.path.join(tmp_dir, f"me-{generation}-big-Data.db")
 
-            actual_out = subprocess.check_output(dump_common_args + [sstable_file])
-            actual_json = json.loads(actual_out)["sstables"]["anonymous"]
+        actual_json = check_json_output(dump_common_args + [sstable_file])["sstables"]["anonymous"]
 
-            assert actual_json == original_json
+        assert actual_json == original_json
 
 
 def script_consume_test_table_factory(cql, keyspace):
@@ -270,25 +376,31 @@ def script_consume_test_table_factory(cql, keyspace):
 
     cql.execute(schema)
 
+    update_static = cql.prepare(f"UPDATE {keyspace}.{table} SET s = 10 WHERE pk = ?")
+    delete_range = cql.prepare(f"DELETE FROM {keyspace}.{table} WHERE pk = ? AND ck >= 0 AND ck <= 4")
+    insert_row = cql.prepare(f"INSERT INTO {keyspace}.{table} (pk, ck, v) VALUES (?, ?, 0)")
+
     partitions = 4
 
     for sst in range(0, 2):
+        statements = []
         for pk in range(sst * partitions, (sst + 1) * partitions):
             # static row
-            cql.execute(f"UPDATE {keyspace}.{table} SET s = 10 WHERE pk = {pk}")
+            statements.append((update_static, (pk,)))
             # range tombstone
-            cql.execute(f"DELETE FROM {keyspace}.{table} WHERE pk = {pk} AND ck >= 0 AND ck <= 4")
+            statements.append((delete_range, (pk,)))
             # 2 rows
             for ck in range(0, 4):
-                cql.execute(f"INSERT INTO {keyspace}.{table} (pk, ck, v) VALUES ({pk}, {ck}, 0)")
+                statements.append((insert_row, (pk, ck)))
 
+        execute_concurrently(cql, statements)
         nodetool.flush(cql, f"{keyspace}.{table}")
 
     return table, schema
 
 
-def test_scylla_sstable_script_consume_sstable(cql, test_keyspace, scylla_path, scylla_data_dir):
-    script_file = os.path.join(scylla_data_dir, "..", "test_scylla_sstable_script_consume_sstable.lua")
+def test_scylla_sstable_script_consume_sstable(scylla_path, scylla_sstable, temp_workdir):
+    script_file = os.path.join(temp_workdir, "test_scylla_sstable_script_consume_sstable.lua")
 
     script = """
 wr = Scylla.new_json_writer()
@@ -349,30 +461,32 @@ end
     with open(script_file, 'w') as f:
         f.write(script)
 
-    with scylla_sstable(script_consume_test_table_factory, cql, test_keyspace, scylla_data_dir) as (schema_file, sstables):
-        sst1 = os.path.basename(sstables[0])
-        sst2 = os.path.basename(sstables[1])
-        def run_scenario(script_args, expected):
-            print(f"Scenario: '{script_args}'\n")
-            if script_args:
-                script_args = ["--script-arg", script_args]
-            else:
-                script_args = []
-            script_args = [scylla_path, "sstable", "script", "--schema-file", schema_file, "--script-file", script_file] + script_args + sstables[0:2]
-            res = json.loads(subprocess.check_output(script_args))
-            assert res == expected
+    schema_file, sstables = scylla_sstable(script_consume_test_table_factory)
+    sst1 = os.path.basename(sstables[0])
+    sst2 = os.path.basename(sstables[1])
+    def run_scenario(script_args, expected):
+        logger.debug("Scenario: '%s'", script_args)
+        if script_args:
+            script_args = ["--script-arg", script_args]
+        else:
+            script_args = []
+        script_args = [scylla_path, "sstable", "script", "--schema-file", schema_file, "--script-file", script_file] + script_args + sstables[0:2]
+        res = check_json_output(script_args)
+        assert res == expected
 
-        run_scenario("", {'start_sst': None, 'end_sst': None, 'content': [sst1, "ps", sst2, "ps"]})
-        run_scenario("start_sst=1", {'start_sst': 1, 'end_sst': None, 'content': [sst2, "ps"]})
-        run_scenario("start_sst=2", {'start_sst': 2, 'end_sst': None, 'content': [sst1, "ps"]})
-        run_scenario("start_sst=1:end_sst=1", {'start_sst': 1, 'end_sst': 1, 'content': []})
-        run_scenario("start_sst=2:end_sst=2", {'start_sst': 2, 'end_sst': 2, 'content': [sst1, "ps"]})
-        run_scenario("end_sst=1", {'start_sst': None, 'end_sst': 1, 'content': [sst1, "ps"]})
-        run_scenario("end_sst=2", {'start_sst': None, 'end_sst': 2, 'content': [sst1, "ps", sst2, "ps"]})
+    run_scenario("", {'start_sst': None, 'end_sst': None, 'content': [sst1, "ps", sst2, "ps"]})
+    run_scenario("start_sst=1", {'start_sst': 1, 'end_sst': None, 'content': [sst2, "ps"]})
+    run_scenario("start_sst=2", {'start_sst': 2, 'end_sst': None, 'content': [sst1, "ps"]})
+    run_scenario("start_sst=1:end_sst=1", {'start_sst': 1, 'end_sst': 1, 'content': []})
+    run_scenario("start_sst=2:end_sst=2", {'start_sst': 2, 'end_sst': 2, 'content': [sst1, "ps"]})
+    run_scenario("end_sst=1", {'start_sst': None, 'end_sst': 1, 'content': [sst1, "ps"]})
+    run_scenario("end_sst=2", {'start_sst': None, 'end_sst': 2, 'content': [sst1, "ps", sst2, "ps"]})
 
 
-def test_scylla_sstable_script_slice(cql, test_keyspace, scylla_path, scylla_data_dir):
+def test_scylla_sstable_script_slice(scylla_path, scylla_sstable):
     class bound:
+        __slots__ = ("token", "value", "weight", "is_inf")
+
         @staticmethod
         def unpack_value(value):
             if isinstance(value, tuple):
@@ -383,9 +497,10 @@ def test_scylla_sstable_script_slice(cql, test_keyspace, scylla_path, scylla_dat
         def __init__(self, value, weight):
             self.token, self.value = self.unpack_value(value)
             self.weight = weight
+            self.is_inf = self.token is None and self.value is None
 
         def tri_cmp(self, value):
-            if self.token is None and self.value is None:
+            if self.is_inf:
                 assert(self.weight)
                 return -self.weight
             token, value = self.unpack_value(value)
@@ -398,7 +513,7 @@ def test_scylla_sstable_script_slice(cql, test_keyspace, scylla_path, scylla_dat
             return res if res else -self.weight
 
         def get_value(self, lookup_table, is_start):
-            if self.token is None and self.value is None:
+            if self.is_inf:
                 return '-inf' if is_start else '+inf'
             if self.value is None:
                 return "t{}".format(int(self.token))
@@ -418,6 +533,8 @@ def test_scylla_sstable_script_slice(cql, test_keyspace, scylla_path, scylla_dat
 
 
     class interval:
+        __slots__ = ("start", "end")
+
         def __init__(self, start_bound, end_bound):
             self.start = start_bound
             self.end = end_bound
@@ -441,15 +558,13 @@ def test_scylla_sstable_script_slice(cql, test_keyspace, scylla_path, scylla_dat
     def filter_summary(summary, partition_ranges, clustering_ranges):
         if not partition_ranges:
             return summary
-        filtered_summary = []
-        for partition in summary:
-            if any(map(lambda x: interval.contains(x, (partition["token"], partition["pk"])), partition_ranges)):
-                filtered_summary.append({"pk": partition["pk"], "token": partition["token"], "frags": []})
-                for (t, k) in partition["frags"]:
-                    if t == "rtc" or k is None or not clustering_ranges or any(map(lambda x: interval.contains(x, k), clustering_ranges)):
-                        filtered_summary[-1]["frags"].append((t, k))
 
-        return filtered_summary
+        def frag_selected(t, k):
+            return t == "rtc" or k is None or not clustering_ranges or any(r.contains(k) for r in clustering_ranges)
+
+        return [{"pk": partition["pk"], "token": partition["token"], "frags": [(t, k) for t, k in partition["frags"] if frag_selected(t, k)]}
+                for partition in summary
+                if any(r.contains((partition["token"], partition["pk"])) for r in partition_ranges)]
 
     def serialize_ranges(prefix, ranges, lookup_table):
         serialized_ranges = []
@@ -470,43 +585,50 @@ def test_scylla_sstable_script_slice(cql, test_keyspace, scylla_path, scylla_dat
     scripts_path = os.path.realpath(os.path.join(__file__, '../../../tools/scylla-sstable-scripts'))
     script_file = os.path.join(scripts_path, 'slice.lua')
 
-    with scylla_sstable(script_consume_test_table_factory, cql, test_keyspace, scylla_data_dir) as (schema_file, sstables):
-        reference_summary = summarize_dump(json.loads(subprocess.check_output([scylla_path, "sstable", "dump-data", "--schema-file", schema_file, "--merge"] + sstables)))
-
-        # same order as in dump
-        pks = [(p["token"], p["pk"]) for p in reference_summary]
-        cks = set()
-        for p in reference_summary:
-            for t, ck in p["frags"]:
-                if not ck is None:
-                    cks.add(ck)
-        cks = sorted(list(cks))
-        serialized_pk_lookup = {pk: subprocess.check_output([scylla_path, "types", "serialize", "--full-compound", "-t", "Int32Type", "--", pk]).strip().decode() for t, pk in pks}
-        serialized_ck_lookup = {ck: subprocess.check_output([scylla_path, "types", "serialize", "--prefix-compound", "-t", "Int32Type", "--", ck]).strip().decode() for ck in cks}
-
-        script_common_args = [scylla_path, "sstable", "script", "--schema-file", schema_file, "--merge", "--script-file", script_file]
-
-        def run_scenario(scenario, partition_ranges, clustering_ranges):
-            print(f"running scenario {scenario}")
-            script_args = serialize_ranges("pr", partition_ranges, serialized_pk_lookup) + serialize_ranges("cr", clustering_ranges, serialized_ck_lookup)
-            if script_args:
-                script_args = ["--script-arg"] + [":".join(script_args)]
-            print(f"script_args={script_args}")
-            expected = filter_summary(reference_summary, partition_ranges, clustering_ranges)
-            out = subprocess.check_output(script_common_args + script_args + sstables)
-            summary = summarize_dump(json.loads(out))
-            assert summary == expected
-
-        run_scenario("no args", [], [])
-        run_scenario("full range", [interval(bound.before(None), bound.after(None))], [])
-        run_scenario("(pks[0], +inf)", [interval(bound.after(pks[0]), bound.after(None))], [])
-        run_scenario("(-inf, pks[-3]]", [interval(bound.before(None), bound.after(pks[-3]))], [])
-        run_scenario("[pks[2], pks[-2]]", [interval(bound.before(pks[2]), bound.after(pks[-2]))], [])
-        run_scenario("[pks[0], pks[1]], [pks[2], pks[3]]", [interval(bound.before(pks[1]), bound.after(pks[2])), interval(bound.before(pks[3]), bound.after(pks[4]))], [])
-        run_scenario("[t:pks[2], t:pks[-2]]", [interval(bound.before((pks[2][0], None)), bound.after((pks[-2][0], None)))], [])
-        run_scenario("full pk range | [-inf, cks[2]]", [interval(bound.before(None), bound.after(None))], [interval(bound.before(None), bound.after(cks[2]))])
-        run_scenario("[pks[0], pks[1]] | (cks[0], cks[1]], (cks[2], +inf)", [interval(bound.before(pks[1]), bound.after(pks[2]))],
-                     [interval(bound.after(cks[0]), bound.after(cks[1])), interval(bound.after(cks[2]), bound.after(None))])
+    schema_file, sstables = scylla_sstable(script_consume_test_table_factory)
+    reference_summary = summarize_dump(check_json_output([scylla_path, "sstable", "dump-data", "--schema-file", schema_file, "--merge"] + sstables))
+
+    # same order as in dump
+    pks = [(p["token"], p["pk"]) for p in reference_summary]
+    cks = set()
+    for p in reference_summary:
+        for t, ck in p["frags"]:
+            if not ck is None:
+                cks.add(ck)
+    cks = sorted(list(cks))
+    # Each key needs its own `scylla types serialize` run - several values
+    # passed to one run are serialized together, as a single compound - so
+    # run them concurrently rather than one after the other.
+    def serialize(compound, value):
+        return subprocess.check_output([scylla_path, "types", "serialize", compound, "-t", "Int32Type", "--", value]).strip().decode()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        pk_futures = {pk: executor.submit(serialize, "--full-compound", pk) for t, pk in pks}
+        ck_futures = {ck: executor.submit(serialize, "--prefix-compound", ck) for ck in cks}
+        serialized_pk_lookup = {pk: f.result() for pk, f in pk_futures.items()}
+        serialized_ck_lookup = {ck: f.result() for ck, f in ck_futures.items()}
+
+    script_common_args = [scylla_path, "sstable", "script", "--schema-file", schema_file, "--merge", "--script-file", script_file]
+
+    def run_scenario(scenario, partition_ranges, clustering_ranges):
+        logger.debug("running scenario %s", scenario)
+        script_args = serialize_ranges("pr", partition_ranges, serialized_pk_lookup) + serialize_ranges("cr", clustering_ranges, serialized_ck_lookup)
+        if script_args:
+            script_args = ["--script-arg"] + [":".join(script_args)]
+        logger.debug("script_args=%s", script_args)
+        expected = filter_summary(reference_summary, partition_ranges, clustering_ranges)
+        summary = summarize_dump(check_json_output(script_common_args + script_args + sstables))
+        assert summary == expected
+
+    run_scenario("no args", [], [])
+    run_scenario("full range", [interval(bound.before(None), bound.after(None))], [])
+    run_scenario("(pks[0], +inf)", [interval(bound.after(pks[0]), bound.after(None))], [])
+    run_scenario("(-inf, pks[-3]]", [interval(bound.before(None), bound.after(pks[-3]))], [])
+    run_scenario("[pks[2], pks[-2]]", [interval(bound.before(pks[2]), bound.after(pks[-2]))], [])
+    run_scenario("[pks[0], pks[1]], [pks[2], pks[3]]", [interval(bound.before(pks[1]), bound.after(pks[2])), interval(bound.before(pks[3]), bound.after(pks[4]))], [])
+    run_scenario("[t:pks[2], t:pks[-2]]", [interval(bound.before((pks[2][0], None)), bound.after((pks[-2][0], None)))], [])
+    run_scenario("full pk range | [-inf, cks[2]]", [interval(bound.before(None), bound.after(None))], [interval(bound.before(None), bound.after(cks[2]))])
+    run_scenario("[pks[0], pks[1]] | (cks[0], cks[1]], (cks[2], +inf)", [interval(bound.before(pks[1]), bound.after(pks[2]))],
+                 [interval(bound.after(cks[0]), bound.after(cks[1])), interval(bound.after(cks[2]), bound.after(None))])
 
 
 @pytest.mark.parametrize("table_factory", [
@@ -516,29 +638,32 @@ def test_scylla_sstable_script_slice(cql, test_keyspace, scylla_path, scylla_dat
         clustering_table_with_udt,
         table_with_counters,
 ])
-def test_scylla_sstable_script(cql, test_keyspace, scylla_path, scylla_data_dir, table_factory):
+def test_scylla_sstable_script(scylla_path, scylla_sstable, table_factory):
     scripts_path = os.path.realpath(os.path.join(__file__, '../../../tools/scylla-sstable-scripts'))
     slice_script_path = os.path.join(scripts_path, 'slice.lua')
     dump_script_path = os.path.join(scripts_path, 'dump.lua')
-    with scylla_sstable(table_factory, cql, test_keyspace, scylla_data_dir) as (schema_file, sstables):
-        dump_common_args = [scylla_path, "sstable", "dump-data", "--schema-file", schema_file, "--output-format", "json"]
-        script_common_args = [scylla_path, "sstable", "script", "--schema-file", schema_file]
-
-        # without --merge
-        cxx_json = json.loads(subprocess.check_output(dump_common_args + sstables))
-        dump_lua_json = json.loads(subprocess.check_output(script_common_args + ["--script-file", dump_script_path] + sstables))
-        slice_lua_json = json.loads(subprocess.check_output(script_common_args + ["--script-file", slice_script_path] + sstables))
-
-        assert dump_lua_json == cxx_json
-        assert slice_lua_json == cxx_json
-
-        # with --merge
-        cxx_json = json.loads(subprocess.check_output(dump_common_args + ["--merge"] + sstables))
-        dump_lua_json = json.loads(subprocess.check_output(script_common_args + ["--merge", "--script-file", dump_script_path] + sstables))
-        slice_lua_json = json.loads(subprocess.check_output(script_common_args + ["--merge", "--script-file", slice_script_path] + sstables))
-
-        assert dump_lua_json == cxx_json
-        assert slice_lua_json == cxx_json
+    schema_file, sstables = scylla_sstable(table_factory)
+    dump_common_args = [scylla_path, "sstable", "dump-data", "--schema-file", schema_file, "--output-format", "json"]
+    script_common_args = [scylla_path, "sstable", "script", "--schema-file", schema_file]
+
+    # The dumps only read the sstables, so run all of them at once.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
+        (cxx_json, dump_lua_json, slice_lua_json,
+         merged_cxx_json, merged_dump_lua_json, merged_slice_lua_json) = executor.map(check_json_output, [
+            # without --merge
+            dump_common_args + sstables,
+            script_common_args + ["--script-file", dump_script_path] + sstables,
+            script_common_args + ["--script-file", slice_script_path] + sstables,
+            # with --merge
+            dump_common_args + ["--merge"] + sstables,
+            script_common_args + ["--merge", "--script-file", dump_script_path] + sstables,
+            script_common_args + ["--merge", "--script-file", slice_script_path] + sstables])
+
+    assert dump_lua_json == cxx_json
+    assert slice_lua_json == cxx_json
+
+    assert merged_dump_lua_json == merged_cxx_json
+    assert merged_slice_lua_json == merged_cxx_json
 
 
 @pytest.fixture(scope="function")
@@ -562,10 +687,57 @@ def system_scylla_local_sstable_prepared(cql, scylla_data_dir):
         # with, to make sure they are actually on disk.
         nodetool.flush_keyspace(cql, "system_schema")
         nodetool.flush_keyspace(cql, "system")
-        sstables = glob.glob(os.path.join(scylla_data_dir, "system", "scylla_local-*", "*-Data.db"))
+        sstables = find_sstables(scylla_data_dir, "system", "scylla_local")
         yield sstables[0]
 
 
+def clone_file(src, dst):
+    """ Copies src to dst with copy_file_range(), which lets the filesystem
+    share the extents instead of copying the data (reflink) where it can.
+    Falls back to a regular copy where copy_file_range() isn't supported.
+    """
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            remaining = os.fstat(fsrc.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+    except (AttributeError, OSError):
+        shutil.copyfile(src, dst)
+
+
+def copy_sstable_to_dir(sstable, dest_dir):
+    """ Copies all components of the sstable to dest_dir and returns the path of the copied Data.db. """
+    table_data_dir, sstable_filename = os.path.split(sstable)
+    sstable_prefix = "-".join(sstable_filename.split("-")[:-1])
+    with os.scandir(table_data_dir) as it:
+        sstable_components = [e for e in it if e.name.startswith(sstable_prefix)]
+
+    # Sstables are immutable, so it is safe to hard-link the components
+    # instead of copying them. Fall back to cloning them if linking isn't
+    # possible, e.g. because the destination is on another filesystem.
+    for c in sstable_components:
+        try:
+            os.link(c.path, os.path.join(dest_dir, c.name))
+        except OSError:
+            clone_file(c.path, os.path.join(dest_dir, c.name))
+
+    return os.path.join(dest_dir, sstable_filename)
+
+
+@pytest.fixture(scope="class")
+def system_scylla_local_external_sstable(system_scylla_local_sstable_prepared):
+    """ Copies the system.scylla_local sstable to an external directory.
+
+    The copy is shared by all the tests which only read it, instead of being
+    made again for each of them.
+    """
+    with tempfile.TemporaryDirectory() as external_dir:
+        yield copy_sstable_to_dir(system_scylla_local_sstable_prepared, external_dir)
+
+
 @pytest.fixture(scope="class")
 def system_scylla_local_schema_file():
     """ Prepares a schema.cql with the schema of system.scylla_local. """
@@ -575,8 +747,11 @@ def system_scylla_local_schema_file():
         yield f.name
 
 
+ScyllaHome = collections.namedtuple("ScyllaHome", ["home", "conf_dir", "yaml_file"])
+
+
 @pytest.fixture(scope="class")
-def scylla_home_dir(scylla_data_dir):
+def scylla_home(scylla_data_dir):
     """ Create a temporary directory structure to be used as SCYLLA_HOME.
 
     The top-level directory contains a conf dir, which contains a scylla.yaml,
@@ -584,6 +759,7 @@ def scylla_home_dir(scylla_data_dir):
     The top level directory can be used as SCYLLA_HOME, while the conf dir can be
     used as SCYLLA_CONF environment variables respectively, allowing scylla sstable
     tool to locate the work-directory of the node.
+    Returns a ScyllaHome with the paths of all three.
     """
     with tempfile.TemporaryDirectory() as scylla_home:
         conf_dir = os.path.join(scylla_home, "conf")
@@ -593,13 +769,13 @@ def scylla_home_dir(scylla_data_dir):
         with open(scylla_yaml_file, "w") as f:
             f.write(f"workdir: {os.path.split(scylla_data_dir)[0]}")
 
-        yield scylla_home
+        yield ScyllaHome(scylla_home, conf_dir, scylla_yaml_file)
 
 
 @pytest.fixture(scope="class")
 def system_scylla_local_reference_dump(scylla_path, system_scylla_local_sstable_prepared):
     """ Produce a reference json dump of the system.scylla_local sstable. """
-    dump_reference = subprocess.check_output([
+    dump_reference = check_json_output([
         scylla_path,
         "sstable",
         "dump-data",
@@ -609,10 +785,19 @@ def system_scylla_local_reference_dump(scylla_path, system_scylla_local_sstable_
         "--keyspace", "system",
         "--table", "scylla_local",
         system_scylla_local_sstable_prepared])
-    dump_reference = json.loads(dump_reference)["sstables"]
+    dump_reference = dump_reference["sstables"]
     return list(dump_reference.values())[0]
 
 
+# The class-scoped fixtures below disable auto-compaction of the system
+# keyspaces while the tests read their sstables, and re-enable it when done.
+# Under pytest-xdist, the tests of this class must therefore all run on the
+# same worker: a worker finishing its share of them would otherwise re-enable
+# compaction under the feet of another one, which could then see the sstable
+# compacted away. The xdist_group marker keeps them together, but xdist only
+# honors it with "--dist loadgroup": when running this module with "-n",
+# pass that option too (the default "--dist load" ignores the marker).
+@pytest.mark.xdist_group(name="scylla_sstable_schema_loading")
 class TestScyllaSsstableSchemaLoading:
     """ Test class containing all the schema loader tests.
 
@@ -624,20 +809,10 @@ class TestScyllaSsstableSchemaLoading:
 
     def check(self, scylla_path, extra_args, sstable, dump_reference, cwd=None, env=None):
         dump_common_args = [scylla_path, "sstable", "dump-data", "--output-format", "json", "--logger-log-level", "scylla-sstable=debug"]
-        dump = json.loads(subprocess.check_output(dump_common_args + extra_args + [sstable], cwd=cwd, env=env))["sstables"]
+        dump = check_json_output(dump_common_args + extra_args + [sstable], cwd=cwd, env=env)["sstables"]
         dump = list(dump.values())[0]
         assert dump == dump_reference
 
-    def copy_sstable_to_external_dir(self, system_scylla_local_sstable_prepared, temp_workdir):
-        table_data_dir, sstable_filename = os.path.split(system_scylla_local_sstable_prepared)
-        sstable_glob = "-".join(sstable_filename.split("-")[:-1]) + "*"
-        sstable_components = glob.glob(os.path.join(table_data_dir, sstable_glob))
-
-        for c in sstable_components:
-            shutil.copy(c, temp_workdir)
-
-        return glob.glob(os.path.join(temp_workdir, "*-Data.db"))[0]
-
     def test_table_dir_system_schema(self, scylla_path, system_scylla_local_sstable_prepared, system_scylla_local_reference_dump):
         self.check(
                 scylla_path,
@@ -659,51 +834,47 @@ class TestScyllaSsstableSchemaLoading:
                 system_scylla_local_sstable_prepared,
                 system_scylla_local_reference_dump)
 
-    def test_table_dir_scylla_yaml(self, scylla_path, system_scylla_local_sstable_prepared, system_scylla_local_reference_dump, scylla_home_dir):
-        scylla_yaml_file = os.path.join(scylla_home_dir, "conf", "scylla.yaml")
+    def test_table_dir_scylla_yaml(self, scylla_path, system_scylla_local_sstable_prepared, system_scylla_local_reference_dump, scylla_home):
         self.check(
                 scylla_path,
-                ["--scylla-yaml-file", scylla_yaml_file, "--keyspace", self.keyspace, "--table", self.table],
+                ["--scylla-yaml-file", scylla_home.yaml_file, "--keyspace", self.keyspace, "--table", self.table],
                 system_scylla_local_sstable_prepared,
                 system_scylla_local_reference_dump)
 
-    def test_external_dir_system_schema(self, scylla_path, system_scylla_local_sstable_prepared, system_scylla_local_reference_dump, temp_workdir):
-        ext_sstable = self.copy_sstable_to_external_dir(system_scylla_local_sstable_prepared, temp_workdir)
+    def test_external_dir_system_schema(self, scylla_path, system_scylla_local_reference_dump, system_scylla_local_external_sstable):
         self.check(
                 scylla_path,
                 ["--system-schema", "--keyspace", self.keyspace, "--table", self.table],
-                ext_sstable,
+                system_scylla_local_external_sstable,
                 system_scylla_local_reference_dump)
 
-    def test_external_dir_schema_file(self, scylla_path, system_scylla_local_sstable_prepared, system_scylla_local_reference_dump, temp_workdir, system_scylla_local_schema_file):
-        ext_sstable = self.copy_sstable_to_external_dir(system_scylla_local_sstable_prepared, temp_workdir)
+    def test_external_dir_schema_file(self, scylla_path, system_scylla_local_reference_dump, system_scylla_local_external_sstable, system_scylla_local_schema_file):
         self.check(
                 scylla_path,
                 ["--schema-file", system_scylla_local_schema_file],
-                ext_sstable,
+                system_scylla_local_external_sstable,
                 system_scylla_local_reference_dump)
 
 
-    def test_external_dir_data_dir(self, scylla_path, system_scylla_local_sstable_prepared, system_scylla_local_reference_dump, temp_workdir, scylla_data_dir):
-        ext_sstable = self.copy_sstable_to_external_dir(system_scylla_local_sstable_prepared, temp_workdir)
+    def test_external_dir_data_dir(self, scylla_path, system_scylla_local_reference_dump, system_scylla_local_external_sstable, scylla_data_dir):
         self.check(
                 scylla_path,
                 ["--scylla-data-dir", scylla_data_dir, "--keyspace", self.keyspace, "--table", self.table],
-                ext_sstable,
+                system_scylla_local_external_sstable,
                 system_scylla_local_reference_dump)
 
-    def test_external_dir_scylla_yaml(self, scylla_path, system_scylla_local_sstable_prepared, system_scylla_local_reference_dump, temp_workdir, scylla_home_dir):
-        ext_sstable = self.copy_sstable_to_external_dir(system_scylla_local_sstable_prepared, temp_workdir)
-        scylla_yaml_file = os.path.join(scylla_home_dir, "conf", "scylla.yaml")
+    def test_external_dir_scylla_yaml(self, scylla_path, system_scylla_local_reference_dump, system_scylla_local_external_sstable, scylla_home):
         self.check(
                 scylla_path,
-                ["--scylla-yaml-file", scylla_yaml_file, "--keyspace", self.keyspace, "--table", self.table],
-                ext_sstable,
+                ["--scylla-yaml-file", scylla_home.yaml_file, "--keyspace", self.keyspace, "--table", self.table],
+                system_scylla_local_external_sstable,
                 system_scylla_local_reference_dump)
 
     def test_external_dir_autodetect_schema_file(self, scylla_path, system_scylla_local_sstable_prepared, system_scylla_local_reference_dump, temp_workdir, system_scylla_local_schema_file):
-        ext_sstable = self.copy_sstable_to_external_dir(system_scylla_local_sstable_prepared, temp_workdir)
-        shutil.copy(system_scylla_local_schema_file, os.path.join(temp_workdir, "schema.cql"))
+        # This test adds a schema.cql to the sstable's directory, so it needs
+        # its own copy of the sstable.
+        ext_sstable = copy_sstable_to_dir(system_scylla_local_sstable_prepared, temp_workdir)
+        os.symlink(system_scylla_local_schema_file, os.path.join(temp_workdir, "schema.cql"))
         self.check(
                 scylla_path,
                 [],
@@ -711,30 +882,26 @@ class TestScyllaSsstableSchemaLoading:
                 system_scylla_local_reference_dump,
                 cwd=temp_workdir)
 
-    def test_external_dir_autodetect_conf_dir(self, scylla_path, system_scylla_local_sstable_prepared, system_scylla_local_reference_dump, temp_workdir, scylla_home_dir):
-        ext_sstable = self.copy_sstable_to_external_dir(system_scylla_local_sstable_prepared, temp_workdir)
+    def test_external_dir_autodetect_conf_dir(self, scylla_path, system_scylla_local_reference_dump, system_scylla_local_external_sstable, scylla_home):
         self.check(
                 scylla_path,
                 ["--keyspace", self.keyspace, "--table", self.table],
-                ext_sstable,
+                system_scylla_local_external_sstable,
                 system_scylla_local_reference_dump,
-                cwd=scylla_home_dir)
+                cwd=scylla_home.home)
 
-    def test_external_dir_autodetect_conf_dir_conf_env(self, scylla_path, system_scylla_local_sstable_prepared, system_scylla_local_reference_dump, temp_workdir, scylla_home_dir):
-        ext_sstable = self.copy_sstable_to_external_dir(system_scylla_local_sstable_prepared, temp_workdir)
-        conf_dir = os.path.join(scylla_home_dir, "conf")
+    def test_external_dir_autodetect_conf_dir_conf_env(self, scylla_path, system_scylla_local_reference_dump, system_scylla_local_external_sstable, scylla_home):
         self.check(
                 scylla_path,
                 ["--keyspace", self.keyspace, "--table", self.table],
-                ext_sstable,
+                system_scylla_local_external_sstable,
                 system_scylla_local_reference_dump,
-                env={"SCYLLA_CONF": conf_dir})
+                env={"SCYLLA_CONF": scylla_home.conf_dir})
 
-    def test_external_dir_autodetect_conf_dir_home_env(self, scylla_path, system_scylla_local_sstable_prepared, system_scylla_local_reference_dump, temp_workdir, scylla_home_dir):
-        ext_sstable = self.copy_sstable_to_external_dir(system_scylla_local_sstable_prepared, temp_workdir)
+    def test_external_dir_autodetect_conf_dir_home_env(self, scylla_path, system_scylla_local_reference_dump, system_scylla_local_external_sstable, scylla_home):
         self.check(
                 scylla_path,
                 ["--keyspace", self.keyspace, "--table", self.table],
-                ext_sstable,
+                system_scylla_local_external_sstable,
                 system_scylla_local_reference_dump,
-                env={"SCYLLA_HOME": scylla_home_dir})
+                env={"SCYLLA_HOME": scylla_home.home})
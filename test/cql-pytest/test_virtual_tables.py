@@ -7,53 +7,68 @@ import pytest
 import util
 import nodetool
 import json
+from cassandra.concurrent import execute_concurrent
+from cassandra.query import SimpleStatement
 
 def test_snapshots_table(scylla_only, cql, test_keyspace):
     with util.new_test_table(cql, test_keyspace, 'pk int PRIMARY KEY, v int') as table:
         cql.execute(f"INSERT INTO {table} (pk, v) VALUES (0, 0)")
         nodetool.take_snapshot(cql, table, 'my_tag', False)
-        res = list(cql.execute(f"SELECT keyspace_name, table_name, snapshot_name, live, total FROM system.snapshots"))
-        assert len(res) == 1
+        rows = iter(cql.execute("SELECT keyspace_name, table_name, snapshot_name, live, total FROM system.snapshots"))
+        # Exactly one snapshot is expected
+        res = next(rows, None)
+        assert res is not None
+        assert next(rows, None) is None
         ks, tbl = table.split('.')
-        assert res[0][0] == ks
-        assert res[0][1] == tbl
-        assert res[0][2] == 'my_tag'
+        assert res[0] == ks
+        assert res[1] == tbl
+        assert res[2] == 'my_tag'
 
-def test_clients(scylla_only, cql):
-    columns = ', '.join([
-        'address',
-        'port',
-        'client_type',
-        'connection_stage',
-        'driver_name',
-        'driver_version',
-        'hostname',
-        'protocol_version',
-        'shard_id',
-        'ssl_cipher_suite',
-        'ssl_enabled',
-        'ssl_protocol',
-        'username',
-    ])
-    cls = list(cql.execute(f"SELECT {columns} FROM system.clients"))
-    for cl in cls:
+_clients_columns = (
+    'address',
+    'port',
+    'client_type',
+    'connection_stage',
+    'driver_name',
+    'driver_version',
+    'hostname',
+    'protocol_version',
+    'shard_id',
+    'ssl_cipher_suite',
+    'ssl_enabled',
+    'ssl_protocol',
+    'username',
+)
+
+@pytest.fixture(scope="module")
+def clients_stmt(scylla_only, cql):
+    return cql.prepare(f"SELECT {', '.join(_clients_columns)} FROM system.clients")
+
+def test_clients(cql, clients_stmt):
+    for cl in cql.execute(clients_stmt):
         assert(cl[0] == '127.0.0.1')
         assert(cl[2] == 'cql')
 
 # We only want to check that the table exists with the listed columns, to assert
-# backwards compatibility.
-def _check_exists(cql, table_name, columns):
-    cols = ", ".join(columns)
-    assert list(cql.execute(f"SELECT {cols} FROM system.{table_name}"))
-
-def test_protocol_servers(scylla_only, cql):
-    _check_exists(cql, "protocol_servers", ("name", "listen_addresses", "protocol", "protocol_version"))
+# backwards compatibility. The tables are all probed at once, by a module-scoped
+# fixture, and each test checks the result of the probe of its table.
+_probed_tables = {
+    "protocol_servers": ("name", "listen_addresses", "protocol", "protocol_version"),
+    "runtime_info": ("group", "item", "value"),
+    "versions": ("key", "build_id", "build_mode", "version"),
+}
 
-def test_runtime_info(scylla_only, cql):
-    _check_exists(cql, "runtime_info", ("group", "item", "value"))
+@pytest.fixture(scope="module")
+def table_probes(scylla_only, cql):
+    statements = [(f"SELECT {', '.join(columns)} FROM system.{table_name}", ()) for table_name, columns in _probed_tables.items()]
+    return dict(zip(_probed_tables, execute_concurrent(cql, statements, raise_on_first_error=False)))
 
-def test_versions(scylla_only, cql):
-    _check_exists(cql, "versions", ("key", "build_id", "build_mode", "version"))
+@pytest.mark.parametrize("table_name", list(_probed_tables))
+def test_table_exists(table_probes, table_name):
+    success, result = table_probes[table_name]
+    if not success:
+        raise result
+    assert next(iter(result), None) is not None
 
 # Check reading the system.config table, which should list all configuration
 # parameters. As we noticed in issue #10047, each type of configuration
@@ -62,11 +77,18 @@ def test_versions(scylla_only, cql):
 # specifically the experimental_features option which was wrong in #10047
 # and #11003.
 def test_system_config_read(scylla_only, cql):
-    # All rows should have the columns name, source, type and value:
-    rows = list(cql.execute("SELECT name, source, type, value FROM system.config"))
+    # All rows should have the columns name, source, type and value.
+    # Read the table in small pages, so that we can stop fetching it as soon
+    # as we have seen the options checked below.
+    rows = cql.execute(SimpleStatement("SELECT name, source, type, value FROM system.config", fetch_size=64))
+    # Only keep the values of the options checked below.
+    needed = {'experimental_features', 'restrict_replication_simplestrategy'}
     values = dict()
     for row in rows:
-        values[row.name] = row.value
+        if row.name in needed:
+            values[row.name] = row.value
+            if len(values) == len(needed):
+                break
     # Check that experimental_features exists and makes sense.
     # It needs to be a JSON-formatted strings, and the strings need to be
     # ASCII feature names - not binary garbage as it was in #10047,
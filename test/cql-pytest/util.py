@@ -29,6 +29,11 @@ def random_bytes(length=10):
 # This name doesn't need to be quoted in CQL - it only contains
 # lowercase letters, numbers, and underscores, and starts with a letter.
 unique_name_prefix = 'cql_test_'
+# When the tests are distributed over pytest-xdist workers, names picked by
+# different workers in the same millisecond must not collide, so the prefix
+# also carries the worker's id (gw0, gw1, ...).
+if os.getenv('PYTEST_XDIST_WORKER'):
+    unique_name_prefix += os.getenv('PYTEST_XDIST_WORKER') + '_'
 def unique_name():
     current_ms = int(round(time.time() * 1000))
     # If unique_name() is called twice in the same millisecond...